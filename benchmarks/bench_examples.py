@@ -0,0 +1,37 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Benchmarks of the example geometries, from template to exported parts."""
+
+import numpy as np
+import pytest
+from qmt.geometry import build_3d_geometry, build_3d_geometry_sweep
+
+
+@pytest.mark.benchmark(group="examples")
+def bench_quantum_dot_device(benchmark, fix_quantum_dot_parts):
+    input_file, make_parts = fix_quantum_dot_parts
+    geo = benchmark.pedantic(
+        lambda: build_3d_geometry(input_parts=make_parts(), input_file=input_file),
+        rounds=3,
+    )
+    assert len(geo.parts) == 9
+
+
+@pytest.mark.benchmark(group="examples")
+def bench_geometry_sweep(benchmark, fix_geometry_sweep_parts):
+    input_file, make_parts = fix_geometry_sweep_parts
+
+    def sweep():
+        parts = make_parts()
+        input_parts = parts["extrude"] + parts["sag"] + parts["lithography"]
+        return list(
+            build_3d_geometry_sweep(
+                input_parts=input_parts,
+                input_file=input_file,
+                param_grid={"d1": np.linspace(2.0, 7.0, 3)},
+            )
+        )
+
+    results = benchmark.pedantic(sweep, rounds=3)
+    assert len(results) == 3
@@ -0,0 +1,35 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Benchmarks of synthetic gate layouts, to see how build time scales with the
+number of gates and lithography layers.
+"""
+
+import pytest
+from qmt.geometry import build_3d_geometry
+
+
+@pytest.mark.benchmark(group="scaling gates")
+@pytest.mark.parametrize("n_gates", [2, 8, 32])
+def bench_gates(benchmark, fix_synthetic_layout, n_gates):
+    input_file, make_parts = fix_synthetic_layout(n_gates, 1)
+    geo = benchmark.pedantic(
+        lambda: build_3d_geometry(
+            input_parts=make_parts(), input_file=input_file, export_formats=()
+        ),
+        rounds=3,
+    )
+    assert len(geo.parts) == n_gates + 2
+
+
+@pytest.mark.benchmark(group="scaling litho layers")
+@pytest.mark.parametrize("n_layers", [1, 2, 3])
+def bench_litho_layers(benchmark, fix_synthetic_layout, n_layers):
+    input_file, make_parts = fix_synthetic_layout(4, n_layers)
+    geo = benchmark.pedantic(
+        lambda: build_3d_geometry(
+            input_parts=make_parts(), input_file=input_file, export_formats=()
+        ),
+        rounds=3,
+    )
+    assert len(geo.parts) == n_layers + 5
@@ -0,0 +1,104 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Benchmarks of the stages of a 3D build: part construction by type, cross
+sections, exports and serialization.
+"""
+
+import os
+import pickle
+import numpy as np
+import pytest
+from qmt.geometry import build_3d_geometry
+
+XSEC_DICT = {
+    "xsec_x": {"axis": (1.0, 0.0, 0.0), "distance": 0.0},
+    "xsec_y": {"axis": (0.0, 1.0, 0.0), "distance": 0.0},
+}
+
+
+@pytest.fixture(scope="module")
+def fix_built_geometry(fix_geometry_sweep_parts):
+    """Lithography geometry built without exports, shared by the stage benchmarks."""
+    input_file, make_parts = fix_geometry_sweep_parts
+    return build_3d_geometry(
+        input_parts=make_parts()["lithography"],
+        input_file=input_file,
+        xsec_dict=XSEC_DICT,
+        export_formats=(),
+    )
+
+
+@pytest.mark.benchmark(group="part type")
+@pytest.mark.parametrize(
+    "part_type", ["extrude", "sag", "wire", "shell", "lithography"]
+)
+def bench_part_type(benchmark, fix_geometry_sweep_parts, part_type):
+    """Build the parts of one type, including the parts they depend on."""
+    input_file, make_parts = fix_geometry_sweep_parts
+    geo = benchmark.pedantic(
+        lambda: build_3d_geometry(
+            input_parts=make_parts()[part_type],
+            input_file=input_file,
+            export_formats=(),
+        ),
+        rounds=3,
+    )
+    assert geo.parts
+
+
+@pytest.mark.benchmark(group="cross section")
+def bench_xsec_build(benchmark, fix_geometry_sweep_parts):
+    """Build with cross sections, to compare against the lithography part type."""
+    input_file, make_parts = fix_geometry_sweep_parts
+    geo = benchmark.pedantic(
+        lambda: build_3d_geometry(
+            input_parts=make_parts()["lithography"],
+            input_file=input_file,
+            xsec_dict=XSEC_DICT,
+            export_formats=(),
+        ),
+        rounds=3,
+    )
+    assert set(geo.xsecs) == set(XSEC_DICT)
+
+
+@pytest.mark.benchmark(group="cross section")
+def bench_xsec_sweep(benchmark, fix_built_geometry):
+    xsecs = benchmark.pedantic(
+        fix_built_geometry.xsec_sweep, args=(np.linspace(-1.0, 1.0, 5),), rounds=3
+    )
+    assert len(xsecs) == 5
+
+
+@pytest.mark.benchmark(group="cross section")
+def bench_xsecs_to_2d(benchmark, fix_built_geometry):
+    geos_2d = benchmark(fix_built_geometry.xsecs_to_2d)
+    assert set(geos_2d) == set(XSEC_DICT)
+
+
+@pytest.mark.benchmark(group="export")
+@pytest.mark.parametrize("fmt", ["stp", "stl"])
+def bench_export_parts(benchmark, fix_built_geometry, fmt):
+    def reset_exports():
+        for part in fix_built_geometry.parts.values():
+            setattr(part, "serial_" + fmt, None)
+
+    benchmark.pedantic(
+        fix_built_geometry.export_parts, args=([fmt],), setup=reset_exports, rounds=3
+    )
+    for part in fix_built_geometry.parts.values():
+        assert getattr(part, "serial_" + fmt) is not None
+
+
+@pytest.mark.benchmark(group="serialization")
+def bench_pickle(benchmark, fix_built_geometry):
+    geo = benchmark(lambda: pickle.loads(pickle.dumps(fix_built_geometry)))
+    assert set(geo.parts) == set(fix_built_geometry.parts)
+
+
+@pytest.mark.benchmark(group="serialization")
+def bench_write_fcstd(benchmark, fix_built_geometry, tmp_path):
+    file_path = str(tmp_path / "geometry.fcstd")
+    benchmark(fix_built_geometry.write_fcstd, file_path)
+    assert os.path.isfile(file_path)
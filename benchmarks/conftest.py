@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Fixtures for QMT benchmarks."""
+
+import os
+import pytest
+from qmt.geometry import part_3d
+
+
+@pytest.fixture(scope="session")
+def fix_exampleDir():
+    """Return the example directory path."""
+    return os.path.abspath(
+        os.path.join(os.path.dirname(__file__), os.pardir, "examples")
+    )
+
+
+@pytest.fixture(scope="session")
+def fix_geometry_sweep_parts(fix_exampleDir):
+    """Return the template path and a function creating the parts of the geometry
+    sweep example, keyed by part type.
+    """
+    input_file = os.path.join(
+        fix_exampleDir, "geometry_sweep", "geometry_sweep_showcase.fcstd"
+    )
+
+    def aux_geometry_sweep_parts():
+        """Fresh parts for every build, since building sets their FreeCAD names."""
+        block = part_3d.ExtrudePart(
+            "Parametrised block", "Sketch", thickness=5.0, z0=2.5
+        )
+        sag = part_3d.SAGPart(
+            "Garage", "Sketch002", thickness=6, z_middle=5, t_in=2.5, t_out=0.5, z0=0
+        )
+        wire = part_3d.WirePart("Nanowire", "Sketch003", z0=0, thickness=0.5)
+        shell = part_3d.WireShellPart(
+            "Wire cover",
+            "Sketch004",
+            thickness=0.2,
+            target_wire=wire,
+            shell_verts=[1, 2],
+            depo_mode="depo",
+        )
+        substrate = part_3d.ExtrudePart("Substrate", "Sketch005", thickness=2, z0=-2)
+        wrap = part_3d.LithographyPart(
+            "First layer",
+            "Sketch006",
+            thickness=0.4,
+            layer_num=1,
+            z0=0,
+            litho_base=[substrate, wire, shell],
+        )
+        wrap2 = part_3d.LithographyPart(
+            "Second Layer", "Sketch007", thickness=0.1, layer_num=2
+        )
+        return {
+            "extrude": [block],
+            "sag": [sag],
+            "wire": [wire],
+            "shell": [wire, shell],
+            "lithography": [substrate, wire, shell, wrap, wrap2],
+        }
+
+    return input_file, aux_geometry_sweep_parts
+
+
+@pytest.fixture(scope="session")
+def fix_quantum_dot_parts(fix_exampleDir):
+    """Return the template path and a function creating the parts of the quantum
+    dot device example.
+    """
+    input_file = os.path.join(
+        fix_exampleDir, "quantum_dot_device", "qd_device_parts.FCStd"
+    )
+
+    def aux_quantum_dot_parts():
+        substrate = part_3d.ExtrudePart("Substrate", "Sketch027", z0=-2, thickness=2.0)
+        gates = [
+            part_3d.ExtrudePart(f"Gate {i}", sketch, z0=0, thickness=10)
+            for i, sketch in enumerate(
+                ["Sketch", "Sketch003", "Sketch006", "Sketch011"]
+            )
+        ]
+        wrap1 = part_3d.LithographyPart(
+            "Wrap 1",
+            "Sketch028",
+            z0=0,
+            thickness=2,
+            layer_num=1,
+            litho_base=[substrate] + gates,
+        )
+        layer2 = part_3d.LithographyPart(
+            "Layer 2", "Sketch025", z0=0, thickness=10, layer_num=2
+        )
+        wrap2 = part_3d.LithographyPart(
+            "Wrap 2", "Sketch029", z0=0, thickness=2, layer_num=3
+        )
+        layer3 = part_3d.ExtrudePart("Layer 3", "Sketch026", z0=0, thickness=30)
+        return [substrate] + gates + [wrap1, layer2, wrap2, layer3]
+
+    return input_file, aux_quantum_dot_parts
+
+
+@pytest.fixture(scope="session")
+def fix_synthetic_layout(tmp_path_factory):
+    """Return a function generating a gate layout of a given size.
+
+    The layout has a substrate, n_gates parallel gates and n_layers lithography
+    layers covering all gates, each a bit narrower than the one below.
+    """
+
+    def aux_synthetic_layout(n_gates, n_layers):
+        """Returns the template path and a function creating the parts."""
+        import FreeCAD
+        import Part
+
+        vec = FreeCAD.Vector
+        pitch = 3.0
+        length = n_gates * pitch
+
+        def add_rectangle(label, x0, y0, x1, y1):
+            sketch = doc.addObject("Sketcher::SketchObject", label)
+            corners = [vec(x0, y0, 0), vec(x1, y0, 0), vec(x1, y1, 0), vec(x0, y1, 0)]
+            for i in range(4):
+                sketch.addGeometry(
+                    Part.LineSegment(corners[i], corners[(i + 1) % 4]), False
+                )
+            sketch.Label = label
+
+        doc = FreeCAD.newDocument("syntheticLayout")
+        add_rectangle("substrate", -pitch, -pitch, length + pitch, 10 + pitch)
+        for i in range(n_gates):
+            add_rectangle(f"gate{i}", i * pitch, 0, i * pitch + 1, 10)
+        for m in range(1, n_layers + 1):
+            add_rectangle(f"layer{m}", -1, m, length + 1, 10 - m)
+        doc.recompute()
+        input_file = str(
+            tmp_path_factory.mktemp("layouts") / f"layout_{n_gates}_{n_layers}.fcstd"
+        )
+        doc.saveAs(input_file)
+        FreeCAD.closeDocument(doc.Name)
+
+        def aux_synthetic_parts():
+            substrate = part_3d.ExtrudePart(
+                "Substrate", "substrate", z0=-2, thickness=2
+            )
+            gates = [
+                part_3d.ExtrudePart(f"Gate {i}", f"gate{i}", z0=0, thickness=1)
+                for i in range(n_gates)
+            ]
+            layers = [
+                part_3d.LithographyPart(
+                    f"Layer {m}",
+                    f"layer{m}",
+                    thickness=0.5,
+                    layer_num=m,
+                    z0=0,
+                    litho_base=[substrate] + gates if m == 1 else [],
+                )
+                for m in range(1, n_layers + 1)
+            ]
+            return [substrate] + gates + layers
+
+        return input_file, aux_synthetic_parts
+
+    return aux_synthetic_layout
@@ -6,7 +6,7 @@
 import os
 import numpy as np
 
-from qmt.geometry import part_3d, build_3d_geometry
+from qmt.geometry import part_3d, build_3d_geometry_sweep
 
 # Set up geometry task
 
@@ -48,14 +48,16 @@ virt = part_3d.ExtrudePart("Virtual Domain", "Sketch008", thickness=5.5, virtual
 input_file = "geometry_sweep_showcase.fcstd"  # contains a model parameter 'd1'
 input_parts = [block1, block2, sag, virt, wire, shell, substrate, wrap, wrap2]
 
-# Compute parametrised geometries in parallel with dask
-geometries = []
-for d1 in np.linspace(2.0, 7.0, 3):
-    geometries.append(
-        build_3d_geometry(
-            input_parts=input_parts, input_file=input_file, params={"d1": d1}
-        )
-    )
+# Compute parametrised geometries in parallel worker processes
+# (pass executor=dask_client to run the sweep on a dask cluster instead)
+geometries = [None] * 3
+for i, params, geo in build_3d_geometry_sweep(
+    input_parts=input_parts,
+    input_file=input_file,
+    param_grid={"d1": np.linspace(2.0, 7.0, 3)},
+):
+    print(f"Finished parametrised instance {i} with {params}.")
+    geometries[i] = geo
 
 # Create a local temporary directory to investigate results
 if not os.path.exists("tmp"):
@@ -5,6 +5,8 @@
 
 from .property_map import PropertyMap, MaterialPropertyMap
 from .geo_2d_data import Geo2DData
+from .part_map import Geo2DPartMap, Geo3DPartMap
 from .geo_3d_data import Geo3DData
-from .builder_3d import build_3d_geometry
+from .build_cache import BuildCache, build_cache_key
+from .builder_3d import build_3d_geometry, build_3d_geometry_sweep, Geo3DBuildPool
 from .builder_2d import build_2d_geometry
@@ -0,0 +1,231 @@
+"""
+Contains the BuildCache class, an on-disk cache of built 3D geometries
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import uuid
+from enum import Enum
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from qmt.infrastructure import deserialise
+from .part_3d import Geo3DPart
+from .geo_3d_data import Geo3DData
+
+# Bump this when changes to the geometry build invalidate previously cached results
+CACHE_VERSION = 2
+
+# Part attributes that are outputs of the build rather than inputs
+_BUILD_OUTPUTS = (
+    "built_fc_name",
+    "export_source",
+    "fc_name_from_label",
+    "serial_stl",
+    "serial_stp",
+)
+
+
+def _canonical(obj):
+    """Convert a build input to a JSON-serialisable canonical form."""
+    if isinstance(obj, Geo3DPart):
+        # Parts referenced by other parts are identified by their label
+        return {"part": obj.label}
+    elif isinstance(obj, Enum):
+        return _canonical(obj.value)
+    elif isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    elif isinstance(obj, np.ndarray):
+        return _canonical(obj.tolist())
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif obj is None or isinstance(obj, (str, bool, int, float)):
+        return obj
+    raise TypeError(f"Cannot derive a cache key from {obj!r}.")
+
+
+def canonical_part_spec(part: Geo3DPart) -> Dict:
+    """Return a JSON-serialisable canonical form of a part specification, without
+    the attributes that are set on geometry build.
+    """
+    spec = {k: _canonical(v) for k, v in vars(part).items() if k not in _BUILD_OUTPUTS}
+    if getattr(part, "fc_name_from_label", False):
+        spec["fc_name"] = None  # the caller only gave the label
+    spec["type"] = type(part).__name__
+    return spec
+
+
+def build_cache_key(
+    serial_fcdoc,
+    input_parts: List[Geo3DPart],
+    params: Optional[Dict] = None,
+    xsec_dict: Optional[Dict] = None,
+    lunit: Optional[str] = None,
+    serial_compression: Optional[str] = None,
+    export_formats: Sequence[str] = ("stp", "stl"),
+    stl_options: Optional[Dict] = None,
+) -> str:
+    """Compute the cache key of a `build_3d_geometry` call.
+
+    The key is the sha256 hash of the template file contents and a canonical JSON
+    representation of the remaining build inputs, so it is independent of the template
+    serialisation format, dict ordering and numpy scalar types.
+
+    Parameters
+    ----------
+    serial_fcdoc : str or bytes-like
+        Serialized FreeCAD template.
+    input_parts : list
+        Ordered list of input parts.
+    params : dict
+        Dictionary of parameters to use in FreeCAD. (Default value = None)
+    xsec_dict : dict
+        Dictionary of cross-section specifications. (Default value = None)
+    lunit : str
+        Length unit of the geometry. (Default value = None)
+    serial_compression : str
+        Compression of the binary blobs. (Default value = None)
+    export_formats : sequence of str
+        Formats of the part exports. (Default value = ("stp", "stl"))
+    stl_options : dict
+        Tessellation options of the STL exports. (Default value = None)
+
+    Returns
+    -------
+    key : str
+
+    """
+    inputs = {
+        "version": CACHE_VERSION,
+        "parts": [canonical_part_spec(part) for part in input_parts],
+        "params": _canonical(params or {}),
+        "xsec_dict": _canonical(xsec_dict or {}),
+        "lunit": lunit,
+        "serial_compression": serial_compression,
+        "export_formats": sorted(set(export_formats)),
+        "stl_options": _canonical(stl_options),
+    }
+    digest = hashlib.sha256(deserialise(serial_fcdoc))
+    digest.update(json.dumps(inputs, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """On-disk cache of built geometries with size-bounded LRU eviction.
+
+    Entries are pickled Geo3DData objects in `cache_dir`, named after their key.
+    Entries are written to a temporary file and renamed into place, and lookups
+    refresh the file modification time, which is used as the LRU order. Several
+    processes, e.g. the workers of a sweep, can therefore share a cache directory.
+    Instances only hold the directory and size limit and are cheap to pickle.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache entries. It is created if needed.
+    max_size : int
+        Maximum total size of the cache entries in bytes.
+        (Default value = 2 ** 30)
+
+    """
+
+    suffix = ".geo3d"
+
+    def __init__(self, cache_dir: str, max_size: int = 2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key: str) -> Optional[Geo3DData]:
+        """Return the cached geometry for a key.
+
+        Parameters
+        ----------
+        key : str
+            Key returned by `build_cache_key`.
+
+        Returns
+        -------
+        Geo3DData instance or None if the key is not cached.
+
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                geo = pickle.load(f)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            # Missing or evicted by another process in the meantime
+            return None
+        return geo
+
+    def put(self, key: str, geo: Geo3DData):
+        """Store a geometry and evict the least recently used entries if needed.
+
+        Parameters
+        ----------
+        key : str
+            Key returned by `build_cache_key`.
+        geo : Geo3DData
+            Built geometry.
+
+        Returns
+        -------
+        None
+
+        """
+        tmp_path = os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(geo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self, max_size: Optional[int] = None):
+        """Remove least recently used entries until the cache fits into `max_size`.
+
+        Parameters
+        ----------
+        max_size : int
+            Size limit in bytes. If None, the limit of the cache is used.
+            (Default value = None)
+
+        Returns
+        -------
+        None
+
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        self.evict(0)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def __len__(self) -> int:
+        return sum(1 for f in os.listdir(self.cache_dir) if f.endswith(self.suffix))
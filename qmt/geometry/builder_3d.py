@@ -2,11 +2,14 @@
 The Geo3DBuilder class, which is used to build 3D geometries
 """
 
-from typing import Dict, List, Optional
+import itertools
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from qmt.infrastructure import serialize_file
 import FreeCAD
 from .part_3d import Geo3DPart
 from .geo_3d_data import Geo3DData
+from .build_cache import BuildCache, build_cache_key
 
 
 def build_3d_geometry(
@@ -16,6 +19,16 @@ def build_3d_geometry(
     serialized_input_file: Optional[bytes] = None,
     params: Optional[Dict] = None,
     lunit: Optional[str] = None,
+    serial_compression: Optional[str] = None,
+    keep_template: bool = False,
+    cache: Union[None, str, BuildCache] = None,
+    incremental: bool = False,
+    previous: Optional[Geo3DData] = None,
+    boolean_engine: str = "document",
+    export_formats: Sequence[str] = ("stp", "stl"),
+    export_workers: int = 1,
+    stl_options: Optional[Dict] = None,
+    litho_workers: int = 1,
 ) -> Geo3DData:
     """Build a geometry in 3D.
 
@@ -31,7 +44,9 @@ def build_3d_geometry(
         Dictionary of cross-section specifications. It should be of the
         form {'xsec_name':{'axis':(1,0,0),'distance':0.}}, where the axis parameter is a tuple
         defining the axis that defines the normal of the cross section, and distance is
-        the length along the axis used to set the cross section.
+        the length along the axis used to set the cross section. An optional
+        'deflection' entry sets the maximum distance between curved edges and the
+        polygon segments; without it, curved edges are replaced by their chords.
         (Default value = None)
     serialized_input_file : bytes
         FreeCAD template file that has been serialized using
@@ -43,6 +58,57 @@ def build_3d_geometry(
     params : dict
         Dictionary of parameters to use in FreeCAD.
         (Default value = None)
+    lunit : str
+        Length unit of the geometry.
+        (Default value = None)
+    serial_compression : str
+        Optional compression ("zstd" or "lz4") of the binary blobs holding the built
+        FreeCAD document and the part STEP/STL exports.
+        (Default value = None)
+    keep_template : bool
+        Keep the parsed template document open in this process and reuse it in later
+        calls with the same template, rolling back each build. Meant for long-lived
+        worker processes, see `Geo3DBuildPool`.
+        (Default value = False)
+    cache : BuildCache or str
+        Optional build cache, or the directory of one. If the same template, parts,
+        parameters and cross sections were built before, the cached result is
+        returned instead of building the geometry.
+        (Default value = None)
+    incremental : bool
+        Record the part shapes and build inputs in `Geo3DData.build_record`, so that
+        the result can be passed as `previous` to a later build.
+        (Default value = False)
+    previous : Geo3DData
+        Result of an incremental build with the same template and input part labels.
+        Parts that are affected by neither the changed parameters nor the changed part
+        specifications are taken from it, along with their STEP/STL exports and cross
+        sections, instead of being rebuilt. Implies `incremental`.
+        (Default value = None)
+    boolean_engine : str
+        "document" evaluates booleans through temporary FreeCAD features and document
+        recomputes, "shape" works directly on the shapes and is faster.
+        (Default value = "document")
+    export_formats : sequence of str
+        Formats in which the built parts are exported, any of "stp" and "stl". The
+        `serial_stp` and `serial_stl` attributes of the parts in formats not listed
+        are left as None, and the exports are generated from the built document on
+        first use, see `Geo3DPart.get_serial`. Pass an empty sequence if mostly cross
+        sections are needed.
+        (Default value = ("stp", "stl"))
+    export_workers : int
+        Number of processes exporting the parts concurrently.
+        (Default value = 1)
+    stl_options : dict
+        Tessellation options of the STL exports, passed as keyword arguments to
+        `qmt.geometry.freecad.fileIO.exportMeshed`: "linear_deflection",
+        "angular_deflection", "target_triangles" and "binary". Without tessellation
+        options, the FreeCAD defaults are used.
+        (Default value = None)
+    litho_workers : int
+        Number of processes that construct independent intermediate objects of the
+        lithography parts concurrently.
+        (Default value = 1)
     Returns
     -------
     Geo3DData instance
@@ -55,7 +121,7 @@ def build_3d_geometry(
     elif input_file is not None and serialized_input_file is not None:
         raise ValueError("Both input_file and serialized_input_file were non-none.")
     elif input_file is not None:
-        serial_fcdoc = serialize_file(input_file)
+        serial_fcdoc = serialize_file(input_file, binary=True)
     else:
         serial_fcdoc = serialized_input_file
     if params is None:
@@ -68,15 +134,287 @@ def build_3d_geometry(
     options_dict["params"] = params
     options_dict["xsec_dict"] = xsec_dict
     options_dict["lunit"] = lunit
+    options_dict["serial_compression"] = serial_compression
+    options_dict["incremental"] = incremental or previous is not None
+    options_dict["previous"] = previous
+    options_dict["boolean_engine"] = boolean_engine
+    options_dict["export_formats"] = tuple(export_formats)
+    options_dict["export_workers"] = export_workers
+    options_dict["stl_options"] = stl_options
+    options_dict["litho_workers"] = litho_workers
 
-    data = Geo3DData(lunit)
-    data.serial_fcdoc = serial_fcdoc
-    data.get_data("fcdoc")
+    if cache is not None:
+        if isinstance(cache, str):
+            cache = BuildCache(cache)
+        cache_key = build_cache_key(
+            serial_fcdoc,
+            input_parts,
+            params,
+            xsec_dict,
+            lunit,
+            serial_compression,
+            export_formats,
+            stl_options,
+        )
+        cached = cache.get(cache_key)
+        if cached is not None and (
+            cached.build_record is not None or not options_dict["incremental"]
+        ):
+            return cached
 
-    try:
-        built = build(options_dict)
-    except Exception:
+    if keep_template:
+        from qmt.geometry.freecad.templateCache import buildWithTemplate
+
+        built = buildWithTemplate(options_dict)
+    else:
+        data = Geo3DData(lunit)
+        data.serial_fcdoc = serial_fcdoc
+        data.get_data("fcdoc")
+
+        try:
+            built = build(options_dict)
+        except Exception:
+            FreeCAD.closeDocument("instance")
+            raise
         FreeCAD.closeDocument("instance")
-        raise
-    FreeCAD.closeDocument("instance")
+
+    if cache is not None:
+        cache.put(cache_key, built)
     return built
+
+
+class Geo3DBuildPool(ProcessPoolExecutor):
+    """Pool of long-lived FreeCAD worker processes with warm template documents.
+
+    Every worker imports FreeCAD once and keeps the templates it has seen parsed in
+    memory, so that a build only has to set the parameters and rebuild the parts. Use
+    `submit_build` for single builds, or pass the pool as executor to
+    `build_3d_geometry_sweep`. The pool can be reused across sweeps.
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of worker processes. (Default value = None)
+
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+
+    def submit_build(
+        self,
+        input_parts: List[Geo3DPart],
+        input_file: Optional[str] = None,
+        serialized_input_file: Optional[bytes] = None,
+        **kwargs,
+    ) -> Future:
+        """Build a geometry in a worker process.
+
+        Parameters
+        ----------
+        input_parts : list
+            Ordered list of input parts, leftmost items get built first
+        input_file : str
+            Path to FreeCAD template file. Either this or serialized_input_file
+            must be set (but not both).
+            (Default value = None)
+        serialized_input_file : bytes
+            Serialized FreeCAD template file. (Default value = None)
+        **kwargs :
+            Further arguments of `build_3d_geometry`.
+
+        Returns
+        -------
+        Future of the Geo3DData instance
+
+        """
+        if input_file is not None and serialized_input_file is None:
+            serialized_input_file = serialize_file(input_file, binary=True)
+            input_file = None
+        return self.submit(
+            build_3d_geometry,
+            input_parts,
+            input_file=input_file,
+            serialized_input_file=serialized_input_file,
+            keep_template=True,
+            **kwargs,
+        )
+
+
+# Template of the current sweep worker process, see `_init_sweep_worker`
+_worker_template = {}
+
+
+def _init_sweep_worker(serial_fcdoc: bytes):
+    """Hold the serialized template in a worker process for the whole sweep."""
+    _worker_template["serial_fcdoc"] = serial_fcdoc
+
+
+def _build_sweep_point(
+    serial_fcdoc: Optional[bytes], params: Dict, build_kwargs: Dict
+) -> Geo3DData:
+    """Build a single sweep point, using the worker's template if none is given."""
+    if serial_fcdoc is None:
+        serial_fcdoc = _worker_template["serial_fcdoc"]
+    return build_3d_geometry(
+        serialized_input_file=serial_fcdoc,
+        params=params,
+        keep_template=True,
+        **build_kwargs,
+    )
+
+
+def _expand_param_grid(param_grid: Union[Dict[str, Sequence], Sequence[Dict]]):
+    """Return the list of parameter dicts described by `param_grid`."""
+    if isinstance(param_grid, dict):
+        names = list(param_grid.keys())
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*(param_grid[name] for name in names))
+        ]
+    return [dict(params) for params in param_grid]
+
+
+def build_3d_geometry_sweep(
+    input_parts: List[Geo3DPart],
+    input_file: Optional[str] = None,
+    param_grid: Union[Dict[str, Sequence], Sequence[Dict], None] = None,
+    executor: Any = None,
+    xsec_dict: Dict[str, Dict] = None,
+    serialized_input_file: Optional[bytes] = None,
+    lunit: Optional[str] = None,
+    serial_compression: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    cache: Union[None, str, BuildCache] = None,
+    export_formats: Sequence[str] = ("stp", "stl"),
+    stl_options: Optional[Dict] = None,
+) -> Iterator[Tuple[int, Dict, Geo3DData]]:
+    """Build a geometry in 3D for many parameter sets in parallel.
+
+    FreeCAD is single-threaded, so the sweep is distributed over processes, each
+    running its own FreeCAD session and keeping the parsed template open between
+    builds. Without a dask client, the template is sent to every worker only once
+    rather than with every task. Results are yielded as soon as they are finished,
+    so they generally arrive out of order.
+
+    Parameters
+    ----------
+    input_parts : list
+        Ordered list of input parts, leftmost items get built first
+    input_file : str
+        Path to FreeCAD template file. Either this or serialized_input_file
+        must be set (but not both).
+        (Default value = None)
+    param_grid : dict or list
+        Either a dict mapping FreeCAD parameter names to sequences of values, which
+        sweeps over their cartesian product, or a list of parameter dicts.
+        (Default value = None)
+    executor :
+        Where to run the builds. None starts a process pool with `max_workers`
+        workers for the duration of the sweep. A dask.distributed Client
+        broadcasts the template to its workers; these should use one thread per
+        worker process. Any other `concurrent.futures.Executor`, e.g. a
+        `Geo3DBuildPool` that is reused across sweeps, must run tasks in separate
+        processes and receives the template with every task.
+        (Default value = None)
+    xsec_dict : dict
+        Dictionary of cross-section specifications, see `build_3d_geometry`.
+        (Default value = None)
+    serialized_input_file : bytes
+        FreeCAD template file that has been serialized using
+        qmt.infrastructure.serialize_file. Either this or input_file must be set
+        (but not both).
+        (Default value = None)
+    lunit : str
+        Length unit of the geometry.
+        (Default value = None)
+    serial_compression : str
+        Optional compression ("zstd" or "lz4") of the binary blobs of the results.
+        (Default value = None)
+    max_workers : int
+        Number of worker processes if no executor is given. (Default value = None)
+    cache : BuildCache or str
+        Optional build cache shared by the workers, see `build_3d_geometry`.
+        (Default value = None)
+    export_formats : sequence of str
+        Formats in which the built parts are exported, see `build_3d_geometry`.
+        (Default value = ("stp", "stl"))
+    stl_options : dict
+        Tessellation options of the STL exports, see `build_3d_geometry`.
+        (Default value = None)
+    Returns
+    -------
+    Iterator over (index, params, Geo3DData) tuples, where index is the position of
+    params in the expanded parameter grid.
+
+    """
+    if input_file is None and serialized_input_file is None:
+        raise ValueError("One of input_file or serialized_input_file must be non-none.")
+    elif input_file is not None and serialized_input_file is not None:
+        raise ValueError("Both input_file and serialized_input_file were non-none.")
+    elif input_file is not None:
+        serial_fcdoc = serialize_file(input_file, binary=True)
+    else:
+        serial_fcdoc = serialized_input_file
+    param_list = _expand_param_grid(param_grid if param_grid is not None else [{}])
+    build_kwargs = {
+        "input_parts": input_parts,
+        "xsec_dict": xsec_dict,
+        "lunit": lunit,
+        "serial_compression": serial_compression,
+        "cache": cache,
+        "export_formats": tuple(export_formats),
+        "stl_options": stl_options,
+    }
+
+    return _run_sweep(serial_fcdoc, param_list, build_kwargs, executor, max_workers)
+
+
+def _run_sweep(
+    serial_fcdoc: bytes,
+    param_list: List[Dict],
+    build_kwargs: Dict,
+    executor: Any,
+    max_workers: Optional[int],
+) -> Iterator[Tuple[int, Dict, Geo3DData]]:
+    """Submit the sweep points to `executor` and yield the results as they finish."""
+    own_executor = executor is None
+    if hasattr(executor, "scatter"):  # dask.distributed.Client
+        from distributed import as_completed
+
+        template = executor.scatter(serial_fcdoc, broadcast=True)
+        futures = {
+            executor.submit(
+                _build_sweep_point, template, params, build_kwargs, pure=False
+            ): index
+            for index, params in enumerate(param_list)
+        }
+        completed = as_completed(futures)
+    else:
+        from concurrent.futures import as_completed
+
+        if own_executor:
+            executor = Geo3DBuildPool(
+                max_workers=max_workers,
+                initializer=_init_sweep_worker,
+                initargs=(serial_fcdoc,),
+            )
+        elif not isinstance(executor, Executor):
+            raise ValueError(f"Unsupported executor {executor}.")
+        template = None if own_executor else serial_fcdoc
+        futures = {
+            executor.submit(_build_sweep_point, template, params, build_kwargs): index
+            for index, params in enumerate(param_list)
+        }
+        completed = as_completed(futures)
+
+    try:
+        for future in completed:
+            index = futures[future]
+            yield index, param_list[index], future.result()
+    finally:
+        # Abandoned or failed sweeps should not keep the workers busy
+        for future in futures:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
@@ -7,12 +7,57 @@
 import os
 import sys
 import contextlib
+import multiprocessing
 import shutil
 import tempfile
 import zipfile
 from xml.etree import ElementTree
 import FreeCAD
 
+# Nesting depth of suspended_recompute and the documents waiting for a recompute
+_recomputeState = {"depth": 0, "pending": set()}
+
+
+@contextlib.contextmanager
+def suspended_recompute():
+    """Defer the document recomputes of delete, batch_delete and deepRemove.
+
+    Within the block, these functions only remove objects. Every document that
+    needs a recompute is recomputed once when the outermost block exits.
+    """
+    _recomputeState["depth"] += 1
+    try:
+        yield
+    finally:
+        _recomputeState["depth"] -= 1
+        if not _recomputeState["depth"]:
+            pending = _recomputeState["pending"]
+            _recomputeState["pending"] = set()
+            for docName in pending:
+                if docName in FreeCAD.listDocuments():
+                    FreeCAD.getDocument(docName).recompute()
+
+
+def forkedWorkersAvailable():
+    """Whether this process can start forked worker processes.
+
+    This needs the fork start method, and the process must not be daemonic, like
+    the workers of a ProcessPoolExecutor (e.g. `Geo3DBuildPool`), which can't have
+    children.
+    """
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and not multiprocessing.current_process().daemon
+    )
+
+
+def _recompute(doc):
+    """Recompute a document, unless recomputes are suspended."""
+    if _recomputeState["depth"]:
+        _recomputeState["pending"].add(doc.Name)
+    else:
+        doc.recompute()
+
 
 def delete(obj):
     """Delete an object by FreeCAD name.
@@ -29,24 +74,61 @@ def delete(obj):
     """
     doc = FreeCAD.ActiveDocument
     doc.removeObject(obj.Name)
-    doc.recompute()
+    _recompute(doc)
+
+
+def batch_delete(objList):
+    """Delete several objects with a single recompute. Objects that are no longer in
+    the document are skipped, since another object may have taken over their name.
+
+    Parameters
+    ----------
+    objList : list
+        FreeCAD objects.
+
+    Returns
+    -------
+    None
+
+    """
+    doc = FreeCAD.ActiveDocument
+    # Python wrappers of live objects are unique and stale ones are kept alive by
+    # objList, so ids identify the objects still in the document
+    live = {id(obj) for obj in doc.Objects}
+    for obj in objList:
+        if id(obj) not in live:
+            continue
+        live.discard(id(obj))
+        try:
+            doc.removeObject(obj.Name)
+        except FreeCAD.Base.FreeCADError:
+            pass  # removed along with an object deleted before
+    _recompute(doc)
 
 
-def _deepRemove_impl(obj):
+def _deepRemove_impl(obj, visited=None):
     """Implementation helper for deepRemove.
 
     Parameters
     ----------
     obj : FreeCAD.App.Document
         A FreeCAD object.
+    visited : set
+        Names of the objects already removed, so that shared sub-objects are
+        only removed once. (Default value = None)
 
     Returns
     -------
     None
 
     """
+    if visited is None:
+        visited = set()
+    if obj.Name in visited:
+        return
+    visited.add(obj.Name)
     for child in obj.OutList:
-        _deepRemove_impl(child)
+        _deepRemove_impl(child, visited)
     FreeCAD.ActiveDocument.removeObject(obj.Name)
 
 
@@ -77,7 +159,7 @@ def deepRemove(obj=None, name=None, label=None):
     else:
         raise RuntimeError("No object selected!")
     _deepRemove_impl(obj)
-    doc.recompute()
+    _recompute(doc)
 
 
 @contextlib.contextmanager
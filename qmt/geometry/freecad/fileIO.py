@@ -4,24 +4,52 @@
 
 """Functions that deal with file i/o."""
 
+import functools
+import math
+import multiprocessing
 import os
-from typing import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
 
+import FreeCAD
 import Part
 import Mesh
 
-from .auxiliary import silent_stdout
+from qmt.infrastructure import load_serial, store_serial
+from .auxiliary import forkedWorkersAvailable, silent_stdout
 
 
-def exportMeshed(obj_list: Sequence, file_name: str):
+def exportMeshed(
+    obj_list: Sequence,
+    file_name: str,
+    linear_deflection: Optional[float] = None,
+    angular_deflection: Optional[float] = None,
+    target_triangles: Optional[int] = None,
+    binary: bool = True,
+):
     """Export a STL 3D Mesh file.
 
+    Without any of the tessellation options, the objects are tessellated with the
+    FreeCAD defaults. Otherwise they are tessellated with the given deflections and
+    the combined mesh is optionally decimated.
+
     Parameters
     ----------
     obj_list : list
         List of objects to export.
     file_name : str
         Name of file to create and export into.
+    linear_deflection : float
+        Maximum distance between the mesh and the surface, in model units.
+        (Default value = None, which means 0.1)
+    angular_deflection : float
+        Maximum angle between the normals of neighbouring triangles on curved
+        surfaces, in radians. (Default value = None, which means pi / 6)
+    target_triangles : int
+        If given, the mesh is decimated to at most about this many triangles.
+        (Default value = None)
+    binary : bool
+        Write binary STL if True, ASCII STL if False. (Default value = True)
 
     Returns
     -------
@@ -39,16 +67,85 @@ def exportMeshed(obj_list: Sequence, file_name: str):
     # meshedObj.Mesh=Mesh.Mesh(obj.Shape.tessellate(0.01))
     # meshedObj.Mesh.write(fileName,"STL",meshedObj.Name)
     supported_ext = ".stl"
-    if file_name.endswith(supported_ext):
-        with silent_stdout():
-            Mesh.export(obj_list, file_name)
-    else:
+    if not file_name.endswith(supported_ext):
         raise ValueError(
             file_name
             + " is not a supported extension ("
             + ", ".join(supported_ext)
             + ")"
         )
+    options = (linear_deflection, angular_deflection, target_triangles)
+    if all(option is None for option in options):
+        with silent_stdout():
+            Mesh.export(obj_list, file_name)  # binary STL
+        if binary:
+            return
+        mesh = Mesh.Mesh(file_name)
+    else:
+        mesh = tessellate(
+            obj_list,
+            linear_deflection=linear_deflection,
+            angular_deflection=angular_deflection,
+            target_triangles=target_triangles,
+        )
+    with silent_stdout():
+        mesh.write(file_name, "STL" if binary else "AST")
+
+
+def tessellate(
+    obj_list: Sequence,
+    linear_deflection: Optional[float] = None,
+    angular_deflection: Optional[float] = None,
+    target_triangles: Optional[int] = None,
+):
+    """Tessellate objects into a single mesh with explicit quality settings.
+
+    Parameters
+    ----------
+    obj_list : list
+        List of objects to tessellate.
+    linear_deflection : float
+        Maximum distance between the mesh and the surface, in model units.
+        (Default value = None, which means 0.1)
+    angular_deflection : float
+        Maximum angle between the normals of neighbouring triangles on curved
+        surfaces, in radians. (Default value = None, which means pi / 6)
+    target_triangles : int
+        If given, the mesh is decimated to at most about this many triangles.
+        (Default value = None)
+
+    Returns
+    -------
+    Mesh.Mesh object.
+
+    """
+    import MeshPart
+
+    if linear_deflection is None:
+        linear_deflection = 0.1
+    if angular_deflection is None:
+        angular_deflection = math.pi / 6
+    if linear_deflection <= 0 or angular_deflection <= 0:
+        raise ValueError("Deflections must be positive.")
+    if target_triangles is not None and target_triangles < 1:
+        raise ValueError("target_triangles must be positive.")
+    mesh = Mesh.Mesh()
+    for obj in obj_list:
+        mesh.addMesh(
+            MeshPart.meshFromShape(
+                Shape=obj.Shape,
+                LinearDeflection=linear_deflection,
+                AngularDeflection=angular_deflection,
+                Relative=False,
+            )
+        )
+    if target_triangles is not None and mesh.CountFacets > target_triangles:
+        # The tolerance is set to the mesh size so that only the reduction limits
+        # the decimation
+        mesh.decimate(
+            mesh.BoundBox.DiagonalLength, 1.0 - target_triangles / mesh.CountFacets
+        )
+    return mesh
 
 
 def exportCAD(obj_list: Sequence, file_name: str):
@@ -80,3 +177,159 @@ def exportCAD(obj_list: Sequence, file_name: str):
             + ", ".join(supported_ext)
             + ")"
         )
+
+
+# Export functions by serialisation format
+_exportFcts = {"stp": exportCAD, "stl": exportMeshed}
+
+
+def _exportSerial(obj, formats, compression, meshOptions=None):
+    """Serialise an object in the given formats."""
+    exportFcts = dict(_exportFcts)
+    if meshOptions:
+        exportFcts["stl"] = functools.partial(exportMeshed, **meshOptions)
+    return {
+        fmt: store_serial(
+            [obj], exportFcts[fmt], fmt, binary=True, compression=compression
+        )
+        for fmt in formats
+    }
+
+
+def _exportBrep(label, brep, formats, compression, meshOptions):
+    """Serialise a BREP shape in a worker process of `exportParts`."""
+    docName = f"export_{os.getpid()}"
+    if docName not in FreeCAD.listDocuments():
+        FreeCAD.newDocument(docName)
+    doc = FreeCAD.getDocument(docName)
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    obj = doc.addObject("Part::Feature", "export")
+    obj.Label = label  # the label ends up in the STEP product name
+    obj.Shape = shape
+    doc.recompute()
+    try:
+        return _exportSerial(obj, formats, compression, meshOptions)
+    finally:
+        doc.removeObject(obj.Name)
+
+
+def exportParts(
+    objDict: Dict,
+    formats: Sequence[str] = ("stp", "stl"),
+    compression: Optional[str] = None,
+    maxWorkers: int = 1,
+    meshOptions: Optional[Dict] = None,
+) -> Dict[str, Dict]:
+    """Export several parts to serialised STEP and/or STL files.
+
+    With more than one worker, the part shapes are sent as BREP strings to forked
+    worker processes that export them concurrently. Platforms without fork, and
+    daemonic processes such as the workers of `Geo3DBuildPool`, export serially.
+
+    Parameters
+    ----------
+    objDict : dict
+        FreeCAD objects to export, keyed by part label.
+    formats : sequence of str
+        Export formats, any of "stp" and "stl". (Default value = ("stp", "stl"))
+    compression : str
+        Optional compression of the serialised files, "zstd" or "lz4".
+        (Default value = None)
+    maxWorkers : int
+        Number of export processes. (Default value = 1)
+    meshOptions : dict
+        Keyword arguments of `exportMeshed` for the STL export, e.g.
+        {"linear_deflection": 0.05, "target_triangles": 10000}.
+        (Default value = None)
+
+    Returns
+    -------
+    dict mapping the part labels to dicts of serialised files keyed by format.
+
+    """
+    formats = tuple(formats)
+    for fmt in formats:
+        if fmt not in _exportFcts:
+            raise ValueError(
+                f"Unknown export format {fmt}, use one of {tuple(_exportFcts)}."
+            )
+    if not formats or not objDict:
+        return {label: {} for label in objDict}
+    if maxWorkers <= 1 or len(objDict) == 1 or not forkedWorkersAvailable():
+        return {
+            label: _exportSerial(obj, formats, compression, meshOptions)
+            for label, obj in objDict.items()
+        }
+    labels = list(objDict)
+    breps = [objDict[label].Shape.exportBrepToString() for label in labels]
+    with ProcessPoolExecutor(
+        max_workers=min(maxWorkers, len(labels)),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as pool:
+        results = pool.map(
+            _exportBrep,
+            labels,
+            breps,
+            [formats] * len(labels),
+            [compression] * len(labels),
+            [meshOptions] * len(labels),
+        )
+        return dict(zip(labels, results))
+
+
+def exportFromSerialDoc(
+    serial_fcdoc,
+    fcNames: Dict[str, str],
+    formats: Sequence[str] = ("stp", "stl"),
+    compression: Optional[str] = None,
+    meshOptions: Optional[Dict] = None,
+) -> Dict[str, Dict]:
+    """Export parts of a serialised FreeCAD document, e.g. a built geometry.
+
+    The document is loaded once into a temporary document, which is closed again
+    afterwards.
+
+    Parameters
+    ----------
+    serial_fcdoc : str or bytes-like
+        Serialised FreeCAD document.
+    fcNames : dict
+        FreeCAD names of the objects to export, keyed by part label.
+    formats : sequence of str
+        Export formats, any of "stp" and "stl". (Default value = ("stp", "stl"))
+    compression : str
+        Optional compression of the serialised files, "zstd" or "lz4".
+        (Default value = None)
+    meshOptions : dict
+        Keyword arguments of `exportMeshed` for the STL export.
+        (Default value = None)
+
+    Returns
+    -------
+    dict mapping the part labels to dicts of serialised files keyed by format.
+
+    """
+    activeDoc = FreeCAD.ActiveDocument
+    activeName = activeDoc.Name if activeDoc is not None else None
+
+    def _load_fct(path):
+        doc = FreeCAD.newDocument("export_source")
+        doc.load(path)
+        return doc
+
+    doc = load_serial(serial_fcdoc, _load_fct, "fcstd")
+    try:
+        objDict = {}
+        for label, fcName in fcNames.items():
+            obj = doc.getObject(fcName)
+            if obj is None:
+                raise KeyError(f"Object {fcName} of part {label} not in document.")
+            objDict[label] = obj
+        return exportParts(
+            objDict, formats, compression=compression, meshOptions=meshOptions
+        )
+    finally:
+        FreeCAD.closeDocument(doc.Name)
+        if activeName in FreeCAD.listDocuments():
+            FreeCAD.setActiveDocument(activeName)
@@ -3,6 +3,7 @@
 
 """Utilities to work with general geometries."""
 
+import contextlib
 import numpy as np
 
 import FreeCAD
@@ -10,10 +11,139 @@ import Draft
 import Part
 
 from .auxiliary import *
-from .sketchUtils import findSegments
+from .sketchUtils import cycleRings, findCycles, findSegments, wireSegments
 
 vec = FreeCAD.Vector
 
+# Engine used by genUnion, subtract, intersect and checkOverlap, see booleanEngine
+_booleanSettings = {"engine": "document"}
+
+
+@contextlib.contextmanager
+def booleanEngine(engine):
+    """Select how boolean operations are evaluated within a block.
+
+    The "document" engine (default) adds temporary Part::MultiFuse/Cut/MultiCommon
+    features and recomputes the document. The "shape" engine works directly on
+    `Part.Shape` objects, adds a single Part::Feature per result and never
+    recomputes the document.
+
+    Parameters
+    ----------
+    engine : str
+        "document" or "shape".
+
+    """
+    if engine not in ("document", "shape"):
+        raise ValueError(f"Unknown boolean engine {engine}.")
+    previous = _booleanSettings["engine"]
+    _booleanSettings["engine"] = engine
+    try:
+        yield
+    finally:
+        _booleanSettings["engine"] = previous
+
+
+def _useShapeEngine():
+    return _booleanSettings["engine"] == "shape"
+
+
+def _cleanShape(shape):
+    """Get rid of redundant lines, like copy_move does."""
+    if shape.Vertexes:
+        return shape.removeSplitter()
+    return shape
+
+
+def shapeUnion(shapes):
+    """Fuse a list of shapes, ignoring empty ones.
+
+    Parameters
+    ----------
+    shapes : list
+        List of Part.Shape.
+
+    Returns
+    -------
+    Part.Shape
+
+    """
+    if len(shapes) == 1:
+        return _cleanShape(shapes[0].copy())
+    shapes = [shape for shape in shapes if shape.Vertexes]
+    if not shapes:
+        return Part.Shape()
+    elif len(shapes) == 1:
+        return _cleanShape(shapes[0].copy())
+    return _cleanShape(shapes[0].fuse(shapes[1:]))
+
+
+def shapeSubtract(shape0, shape1):
+    """Cut shape1 from shape0.
+
+    Parameters
+    ----------
+    shape0 : Part.Shape
+
+    shape1 : Part.Shape
+
+
+    Returns
+    -------
+    Part.Shape
+
+    """
+    return _cleanShape(shape0.cut(shape1))
+
+
+def shapeIntersect(shapes):
+    """Intersect a list of shapes.
+
+    Parameters
+    ----------
+    shapes : list
+        List of Part.Shape.
+
+    Returns
+    -------
+    Part.Shape
+
+    """
+    if len(shapes) == 1:
+        return _cleanShape(shapes[0].copy())
+    return _cleanShape(shapes[0].common(shapes[1:]))
+
+
+def shapesOverlap(shapes):
+    """Check if the intersection of a list of shapes is nonempty.
+
+    Parameters
+    ----------
+    shapes : list
+        List of Part.Shape.
+
+    Returns
+    -------
+    Boolean
+
+    """
+    return bool(shapes[0].common(shapes[1:]).Vertexes)
+
+
+def _addShapeFeature(shape, label):
+    """Add a Part::Feature holding a boolean result, without recomputing."""
+    obj = FreeCAD.ActiveDocument.addObject("Part::Feature", "Shape")
+    obj.Shape = shape
+    obj.Label = label
+    return obj
+
+
+def _removeObjects(objList):
+    """Remove objects without recomputing the document."""
+    doc = FreeCAD.ActiveDocument
+    for obj in objList:
+        doc.removeObject(obj.Name)
+
 
 def extrude_partwb(sketch, length, reverse=False, name=None):
     """Extrude via Part workbench.
@@ -181,6 +311,13 @@ def genUnion(objList, consumeInputs=False):
     doc = FreeCAD.ActiveDocument
     if not objList:
         return None
+    elif _useShapeEngine():
+        returnObj = _addShapeFeature(
+            shapeUnion([obj.Shape for obj in objList]), objList[0].Label
+        )
+        if consumeInputs:
+            _removeObjects(objList)
+        return returnObj
     elif len(objList) == 1:
         returnObj = copy_move(objList[0])
         returnObj.Label = objList[0].Label
@@ -272,6 +409,11 @@ def subtract(obj0, obj1, consumeInputs=False):
 
     """
     doc = FreeCAD.ActiveDocument
+    if _useShapeEngine():
+        returnObj = _addShapeFeature(shapeSubtract(obj0.Shape, obj1.Shape), "Cut")
+        if consumeInputs:
+            _removeObjects([obj0, obj1])
+        return returnObj
     tempObj = doc.addObject("Part::Cut")
     tempObj.Base = obj0
     tempObj.Tool = obj1
@@ -328,6 +470,13 @@ def intersect(objList, consumeInputs=False):
 
     """
     doc = FreeCAD.ActiveDocument
+    if _useShapeEngine():
+        returnObj = _addShapeFeature(
+            shapeIntersect([obj.Shape for obj in objList]), "Common"
+        )
+        if consumeInputs:
+            _removeObjects(objList)
+        return returnObj
     intersectTemp = doc.addObject("Part::MultiCommon")
     intersectTemp.Shapes = objList
     doc.recompute()
@@ -341,29 +490,135 @@ def intersect(objList, consumeInputs=False):
     return returnObj
 
 
-def checkOverlap(objList):
+def _onlySolids(shape):
+    """Whether a shape is made of solids only, without loose faces."""
+    solids = shape.Solids
+    return bool(solids) and len(shape.Faces) == sum(len(s.Faces) for s in solids)
+
+
+def shapesDisjoint(shape0, shape1, tol=1e-7):
+    """Cheap test of whether two shapes certainly do not overlap.
+
+    The bounding boxes are compared first, then the distance between the shapes.
+    Solids whose boundaries are apart can still overlap if one contains the other.
+    Each solid then lies either entirely inside or entirely outside of each solid
+    of the other shape, which is checked with one of its vertices. Shapes that
+    are not made of solids only are left to the exact check.
+
+    Parameters
+    ----------
+    shape0 : Part.Shape
+
+    shape1 : Part.Shape
+
+    tol : float
+        Distance below which the shapes are considered to touch.
+        (Default value = 1e-7)
+
+    Returns
+    -------
+    True if the shapes are disjoint, False if an exact check is needed.
+
+    """
+    if not shape0.BoundBox.intersect(shape1.BoundBox):
+        return True
+    if not _onlySolids(shape0) or not _onlySolids(shape1):
+        return False
+    if shape0.distToShape(shape1)[0] <= tol:
+        return False
+    for inner, outer in ((shape0, shape1), (shape1, shape0)):
+        for innerSolid in inner.Solids:
+            if not innerSolid.Vertexes:
+                return False
+            point = innerSolid.Vertexes[0].Point
+            for outerSolid in outer.Solids:
+                if outerSolid.isInside(point, tol, True):
+                    return False
+    return True
+
+
+def checkOverlap(objList, cache=None):
     """Checks if a list of objects, when intersected, contains a finite volume.abs
     Returns true if it does, returns false if the intersection is empty.
 
+    Pairs of objects are screened with `shapesDisjoint` before the intersection
+    is computed.
+
     Parameters
     ----------
     objList :
 
+    cache : dict
+        Results for pairs of objects. Entries are keyed by the objects and the
+        hash codes of their current shapes, so changed shapes are checked again.
+        (Default value = None)
 
     Returns
     -------
     Boolean
 
     """
-    intObj = intersect(objList)
-    if not intObj.Shape.Vertexes:
-        overlap = False
+    key = None
+    if len(objList) == 2:
+        shapes = [obj.Shape for obj in objList]
+        # The entries hold on to the objects, so their ids can't be reused
+        key = tuple(
+            sorted((id(obj), shape.hashCode()) for obj, shape in zip(objList, shapes))
+        )
+        if cache is not None and key in cache:
+            return cache[key][1]
+        if shapesDisjoint(*shapes):
+            if cache is not None:
+                cache[key] = (tuple(objList), False)
+            return False
+    if _useShapeEngine():
+        overlap = shapesOverlap([obj.Shape for obj in objList])
     else:
-        overlap = True
-    delete(intObj)
+        intObj = intersect(objList)
+        if not intObj.Shape.Vertexes:
+            overlap = False
+        else:
+            overlap = True
+        delete(intObj)
+    if cache is not None and key is not None:
+        cache[key] = (tuple(objList), overlap)
     return overlap
 
 
+def overlappingPairs(objList):
+    """Find the pairs of objects whose bounding boxes overlap or touch.
+
+    Uses a sweep and prune over the x axis, so only boxes that overlap along x
+    are compared against each other. This is a cheap conservative prefilter for
+    `checkOverlap`, which is only needed for the returned pairs.
+
+    Parameters
+    ----------
+    objList :
+        List of FreeCAD objects with a Shape.
+
+    Returns
+    -------
+    Set of index tuples (i, j) with i < j.
+
+    """
+    bounds = np.array([getBB(obj) for obj in objList], dtype=float).reshape(-1, 6)
+    lower = bounds[:, 0::2]  # xMin, yMin, zMin
+    upper = bounds[:, 1::2]  # xMax, yMax, zMax
+    pairs = set()
+    active = np.zeros(0, dtype=int)
+    for i in np.argsort(lower[:, 0], kind="stable"):
+        # Drop boxes that end before this one starts
+        active = active[upper[active, 0] >= lower[i, 0]]
+        overlap = np.all(
+            (lower[active, 1:] <= upper[i, 1:]) & (lower[i, 1:] <= upper[active, 1:]),
+            axis=1,
+        )
+        pairs.update((min(i, j), max(i, j)) for j in active[overlap].tolist())
+        active = np.append(active, i)
+    return pairs
+
+
 def isNonempty(obj):
     """Checks if an object is nonempty (returns True) or empty (returns False).
 
@@ -558,6 +813,65 @@ def draftOffset(inputSketch, t):
     return returnSketch
 
 
+def offsetSketch(inputSketch, thicknesses, name=None):
+    """Offset the closed wires of a sketch within their plane. Positive thicknesses
+    inflate the enclosed face, while negative ones deflate it. Corners stay sharp.
+
+    Several thicknesses can be given at once; the face enclosed by the sketch is
+    then only constructed once.
+
+    Parameters
+    ----------
+    inputSketch :
+        Sketch or other object whose shape is made of closed planar wires.
+    thicknesses : float or list of float
+        Signed offset distance(s).
+    name : str
+        Name of the returned objects; defaults to the sketch name with an
+        "_offset" suffix.
+        (Default value = None)
+
+    Returns
+    -------
+    Part::Feature holding the offset wires, or a list of them if a list of
+    thicknesses was given.
+
+    """
+    doc = FreeCAD.ActiveDocument
+    wires = inputSketch.Shape.Wires
+    if not wires or not all(wire.isClosed() for wire in wires):
+        raise ValueError(f"Sketch {inputSketch.Name} has no closed wires to offset.")
+    face = Part.makeFace(wires, "Part::FaceMakerBullseye")
+    if name is None:
+        name = f"{inputSketch.Name}_offset"
+
+    returnSketches = []
+    for t in np.atleast_1d(thicknesses).tolist():
+        if np.isclose(t, 0):
+            shape = face.copy()
+        else:
+            try:
+                shape = face.makeOffset2D(t, 2)  # join type 2: sharp corners
+            except Part.OCCError:
+                shape = None
+        # Deflating a face beyond its inner radius leaves nothing behind
+        if shape is None or not shape.Faces or np.isclose(shape.Area, 0):
+            raise ValueError(
+                f"Failed to offset the sketch {inputSketch.Name} by amount {t}"
+            )
+        offsetWires = [wire for offsetFace in shape.Faces for wire in offsetFace.Wires]
+        returnSketch = doc.addObject("Part::Feature", name)
+        if len(offsetWires) == 1:
+            returnSketch.Shape = offsetWires[0]
+        else:
+            returnSketch.Shape = Part.Compound(offsetWires)
+        returnSketches.append(returnSketch)
+    doc.recompute()
+    if np.ndim(thicknesses) == 0:
+        return returnSketches[0]
+    return returnSketches
+
+
 def centerObjects(objsList):
     """Move all the objects in the list in the x-y plane so that they are
     centered about the origin.
@@ -605,10 +919,55 @@ def crossSection(obj, axis=(1.0, 0.0, 0.0), d=1.0, name=None):
     doc = FreeCAD.ActiveDocument
     if name is None:
         name = obj.Name + "_section"
-    wires = list()
-    shape = obj.Shape
-    for i in shape.slice(vec(axis[0], axis[1], axis[2]), d):
-        wires.append(i)
+    wires = sliceShape(obj.Shape, axis=axis, d=d)
     returnObj = doc.addObject("Part::Feature", name)
     returnObj.Shape = Part.Compound(wires)
     return returnObj
+
+
+def sliceShape(shape, axis=(1.0, 0.0, 0.0), d=1.0):
+    """Return the wires of the cross section of a shape along axis.
+
+    Parameters
+    ----------
+    shape : Part.Shape
+        A FreeCAD shape.
+    axis :
+        (Default value = (1.0, 0.0, 0.0)
+    d : float
+        (Default value = 1.0)
+
+    Returns
+    -------
+    list of Part.Wire objects.
+
+    """
+    return list(shape.slice(vec(axis[0], axis[1], axis[2]), d))
+
+
+def sectionRings(shape, axis=(1.0, 0.0, 0.0), d=1.0, deflection=None):
+    """Return the closed rings of the cross section of a shape along axis.
+
+    Unlike `crossSection`, this works on the shape alone and adds nothing to the
+    document.
+
+    Parameters
+    ----------
+    shape : Part.Shape
+        A FreeCAD shape.
+    axis :
+        (Default value = (1.0, 0.0, 0.0)
+    d : float
+        (Default value = 1.0)
+    deflection : float
+        Maximum distance between curved edges and the ring segments. If None,
+        curved edges are replaced by the segment between their end points.
+        (Default value = None)
+
+    Returns
+    -------
+    list of numpy arrays with [vertexIndex,coordinate].
+
+    """
+    segments = wireSegments(sliceShape(shape, axis=axis, d=d), deflection)
+    return cycleRings(segments, findCycles(segments))
@@ -3,7 +3,10 @@
 
 """Functions that perform composite executions."""
 
+import re
+import multiprocessing
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 import logging
 
@@ -11,10 +14,11 @@ import logging
 
 import FreeCAD
 import Draft
+import Part
 
 # TODO: use namespace in code
 from qmt.geometry.freecad.auxiliary import *
-from qmt.geometry.freecad.fileIO import exportCAD, exportMeshed
+from qmt.geometry.freecad.fileIO import exportParts
 from qmt.geometry.freecad.geomUtils import (
     extrude,
     copy_move,
@@ -23,21 +27,19 @@ from qmt.geometry.freecad.geomUtils import (
     makeBB,
     makeHexFace,
     extrudeBetween,
-    draftOffset,
+    offsetSketch,
     intersect,
     checkOverlap,
+    overlappingPairs,
     subtract,
-    crossSection,
-)
-from qmt.geometry.freecad.sketchUtils import (
-    findSegments,
-    splitSketch,
-    extendSketch,
-    findEdgeCycles,
+    booleanEngine,
+    sectionRings,
 )
+from qmt.geometry.freecad.sketchUtils import findSegments, splitSketch, extendSketch
 
-from qmt.infrastructure import store_serial
 from qmt.geometry import Geo3DData, part_3d
+from qmt.geometry.build_cache import canonical_part_spec
+from qmt.geometry.freecad.templateCache import templateKey
 
 
 DBG_OUT = logging.getLogger().level <= logging.DEBUG
@@ -76,10 +78,147 @@ def set_params(doc, paramDict):
     doc.recompute()
 
 
+def param_dependents(doc, aliases):
+    """Return the names of all objects that depend on the given spreadsheet aliases.
+
+    An object depends on an alias if one of its expressions mentions it, or if it
+    (recursively) depends on such an object.
+
+    Parameters
+    ----------
+    doc : FreeCAD.App.Document
+
+    aliases : set
+        Names of spreadsheet aliases.
+
+    Returns
+    -------
+    Set of object names.
+
+    """
+    names = set()
+    if not aliases:
+        return names
+    for obj in doc.Objects:
+        for _, expression in obj.ExpressionEngine:
+            if aliases & set(re.findall(r"[A-Za-z_]\w*", expression)):
+                names.add(obj.Name)
+                names.update(o.Name for o in obj.InListRecursive)
+                break
+    return names
+
+
+def find_reusable_parts(doc, opts, previous):
+    """Find the parts whose unsubtracted shape is unchanged since a previous build.
+
+    A part has to be rebuilt if its specification changed, or if its FreeCAD source
+    objects depend on a parameter whose value changed. Wire shells are rebuilt
+    with their target wire, and all lithography parts are rebuilt together if
+    one of them or one of their base parts is rebuilt.
+
+    Parameters
+    ----------
+    doc : FreeCAD.App.Document
+        Template document, with fc_name set on all input parts.
+    opts : dict
+        Options dict in the QMT Geometry3D.__init__ input format.
+    previous : Geo3DData
+        Result of an incremental build.
+
+    Returns
+    -------
+    Set of part labels.
+
+    """
+    record = previous.build_record
+    if record is None:
+        raise ValueError("The previous geometry was not built incrementally.")
+    labels = [part.label for part in opts["input_parts"]]
+    if (
+        record["template"] != templateKey(opts["serial_fcdoc"])
+        or record["order"] != labels
+    ):
+        return set()
+
+    old_params = record["params"]
+    new_params = opts.get("params", {})
+    changed_params = {
+        key
+        for key in set(old_params) | set(new_params)
+        if key not in old_params
+        or key not in new_params
+        or not np.array_equal(old_params[key], new_params[key])
+    }
+    dirty_objects = param_dependents(doc, changed_params)
+
+    def _changed(part):
+        return (
+            part.fc_name is None
+            or part.fc_name in dirty_objects
+            or part.label not in previous.parts
+            or canonical_part_spec(part)
+            != canonical_part_spec(previous.parts[part.label])
+        )
+
+    dirty = set()
+    for part in opts["input_parts"]:
+        if _changed(part):
+            dirty.add(part.label)
+        elif isinstance(part, part_3d.WireShellPart) and _changed(part.target_wire):
+            dirty.add(part.label)
+    litho_parts = [
+        part
+        for part in opts["input_parts"]
+        if isinstance(part, part_3d.LithographyPart)
+    ]
+    for part in litho_parts:
+        if part.label in dirty or any(
+            base.label in dirty or _changed(base) for base in part.litho_base
+        ):
+            dirty.update(p.label for p in litho_parts)
+            break
+    return set(labels) - dirty
+
+
+def add_brep_feature(doc, name, brep):
+    """Add a Part::Feature holding a shape given as BREP string.
+
+    Parameters
+    ----------
+    doc : FreeCAD.App.Document
+
+    name : str
+        Name of the new object.
+    brep : str
+        Shape in BREP format.
+
+    Returns
+    -------
+    The new object.
+
+    """
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    obj = doc.addObject("Part::Feature", name)
+    obj.Shape = shape
+    return obj
+
+
+def _bound_box(bounds):
+    return FreeCAD.BoundBox(*bounds)
+
+
+def _bounds(shape):
+    bb = shape.BoundBox
+    return (bb.XMin, bb.YMin, bb.ZMin, bb.XMax, bb.YMax, bb.ZMax)
+
+
 class DummyInfo:
     def __init__(self):
         self.trash = []
         self.litho_setup_done = False
+        # checkOverlap results for pairs of lithography objects
+        self.overlapCache = {}
 
 
 def build(opts):
@@ -89,26 +228,37 @@ def build(opts):
     ----------
     opts : dict
         Options dict in the QMT Geometry3D.__init__ input format.
-        Options dict in the QMT Geometry3D.__init__ input format.
+        The optional "boolean_engine" entry selects the engine of the boolean
+        operations, see geomUtils.booleanEngine.
 
     Returns
     -------
     Geo3DData object.
 
     """
+    with booleanEngine(opts.get("boolean_engine", "document")):
+        return _build(opts)
+
+
+def _build(opts):
+    """Implementation of build."""
     doc = FreeCAD.ActiveDocument
     geo = Geo3DData(opts.get("lunit", None))
+    previous = opts.get("previous", None)
+    incremental = opts.get("incremental", False) or previous is not None
 
     # Schedule for deletion all objects not explicitly selected by the user
     input_parts_names = []
     for part in opts["input_parts"]:
-        if part.fc_name is None:
+        # Look the name up again if an earlier build did, the template may differ
+        if part.fc_name is None or getattr(part, "fc_name_from_label", False):
             obj_list = doc.getObjectsByLabel(part.label)
             if len(obj_list) != 1:
                 msg = f"Part labeled {part.label} returned object list {obj_list}"
                 raise KeyError(msg)
             fc_name = obj_list[0].Name
             part.fc_name = fc_name
+            part.fc_name_from_label = True
         else:
             fc_name = part.fc_name
         input_parts_names += [fc_name]
@@ -126,17 +276,35 @@ def build(opts):
 
     doc.recompute()  # recompute here to update any sketches that change due to parameters
 
+    # Parts whose unsubtracted shape can be taken from the previous build
+    reusable = set()
+    if previous is not None:
+        reusable = find_reusable_parts(doc, opts, previous)
+        logging.debug(f"Reusing {len(reusable)} of {len(input_parts_names)} parts")
+
     if "built_part_names" not in opts:
         opts["built_part_names"] = {}
     if "serial_stp_parts" not in opts:
         opts["serial_stp_parts"] = {}
+    # Offsets generated during this build, see gen_offset
+    opts["offset_cache"] = {}
+    # Input part of each built part name, for offsets of special parts
+    opts["built_part_inputs"] = {}
 
     # Build the parts
     info_holder = DummyInfo()  # temporary workaround to support old litho code
     built_parts = []
+    raw_breps = {}
+    raw_bounds = {}
     for input_part in opts["input_parts"]:
 
-        if isinstance(input_part, part_3d.ExtrudePart):
+        if input_part.label in reusable:
+            part = add_brep_feature(
+                doc,
+                input_part.label,
+                previous.build_record["parts"][input_part.label]["raw"],
+            )
+        elif isinstance(input_part, part_3d.ExtrudePart):
             part = build_extrude(input_part)
         elif isinstance(input_part, part_3d.SAGPart):
             part = build_sag(input_part)
@@ -154,24 +322,52 @@ def build(opts):
         assert part is not None
         doc.recompute()
         built_parts.append(part)
+        if incremental:
+            raw_breps[input_part.label] = part.Shape.exportBrepToString()
+            raw_bounds[input_part.label] = _bounds(part.Shape)
         # needed for litho steps
         opts["built_part_names"][input_part.label] = part.Name
+        opts["built_part_inputs"][part.Name] = input_part
 
     # Cleanup
     if not DBG_OUT:
-        collect_garbage(info_holder)
-        for obj in blacklist:
-            delete(obj)
-        doc.recompute()
+        with suspended_recompute():
+            collect_garbage(info_holder)
+            batch_delete(blacklist)
+
+    # Reused parts keep their previous final shape unless a rebuilt part that is
+    # subtracted from them overlaps them, before or after the change
+    unchanged = set()
+    if previous is not None:
+        rebuilt_bounds = []
+        for input_part in opts["input_parts"]:
+            label = input_part.label
+            if label in reusable and (
+                input_part.virtual
+                or not any(
+                    _bound_box(raw_bounds[label]).intersect(_bound_box(bounds))
+                    for bounds in rebuilt_bounds
+                )
+            ):
+                unchanged.add(label)
+            if label not in reusable and not input_part.virtual:
+                rebuilt_bounds.append(raw_bounds[label])
+                if label in previous.build_record["parts"]:
+                    rebuilt_bounds.append(
+                        previous.build_record["parts"][label]["bounds"]
+                    )
 
     # Subtraction (removes the need for subtractlists)
+    # Subtracting only shrinks parts, so pairs whose initial bounding boxes are
+    # disjoint never need the boolean overlap check
+    candidate_pairs = overlappingPairs(built_parts)
     for i, (input_part, part) in enumerate(zip(opts["input_parts"], built_parts)):
-        if input_part.virtual:
+        if input_part.virtual or input_part.label in unchanged:
             continue
-        for other_input_part, other_part in zip(
-            opts["input_parts"][0:i], built_parts[0:i]
+        for j, (other_input_part, other_part) in enumerate(
+            zip(opts["input_parts"][0:i], built_parts[0:i])
         ):
-            if other_input_part.virtual:
+            if other_input_part.virtual or (j, i) not in candidate_pairs:
                 continue
             if checkOverlap([part, other_part]):
                 cut = subtract(
@@ -186,27 +382,124 @@ def build(opts):
                 part = simple_copy
                 built_parts[i] = simple_copy
 
+    # Parts subtracted from the raw shapes above are set to their previous result
+    for input_part, built_part in zip(opts["input_parts"], built_parts):
+        if input_part.label in unchanged:
+            final = Part.Shape()
+            final.importBrepFromString(
+                previous.build_record["parts"][input_part.label]["final"]
+            )
+            built_part.Shape = final
+    doc.recompute()
+
     # Update names and store the built parts
+    compression = opts.get("serial_compression", None)
+    export_formats = tuple(opts.get("export_formats", ("stp", "stl")))
+    stl_options = opts.get("stl_options", None)
     built_parts_dict = {}  # dict for cross sections
+    to_export = {}
     for input_part, built_part in zip(opts["input_parts"], built_parts):
         built_part.Label = input_part.label  # here it's collision free
         output_part = deepcopy(input_part)
-        output_part.serial_stp = store_serial([built_part], exportCAD, "stp")
-        output_part.serial_stl = store_serial([built_part], exportMeshed, "stl")
+        if input_part.label in unchanged:
+            previous_part = previous.parts[input_part.label]
+            previous_source = getattr(previous_part, "export_source", None)
+            # Exports are only reused if they were encoded the same way
+            if previous_source is not None and previous_source[1] == compression:
+                output_part.serial_stp = previous_part.serial_stp
+                if previous_source[2] == stl_options:
+                    output_part.serial_stl = previous_part.serial_stl
+        if any(getattr(output_part, "serial_" + fmt) is None for fmt in export_formats):
+            to_export[input_part.label] = built_part
         output_part.built_fc_name = built_part.Name
         geo.add_part(output_part.label, output_part)
         # dict for cross sections
         built_parts_dict[input_part.label] = built_part
-
-    # Build cross sections:
-    for xsec_name in opts["xsec_dict"]:
-        axis = opts["xsec_dict"][xsec_name]["axis"]
-        distance = opts["xsec_dict"][xsec_name]["distance"]
-        polygons = buildCrossSection(xsec_name, axis, distance, built_parts_dict)
+    exports = exportParts(
+        to_export,
+        export_formats,
+        compression=compression,
+        maxWorkers=opts.get("export_workers", 1),
+        meshOptions=stl_options,
+    )
+    for label, serials in exports.items():
+        for fmt, serial in serials.items():
+            setattr(geo.parts[label], "serial_" + fmt, serial)
+
+    # Build cross sections, reusing the polygons of unchanged parts if possible
+    full_xsecs = {}
+    partial_xsecs = {}
+    for xsec_name, xsec in opts["xsec_dict"].items():
+        previous_xsec = None
+        if previous is not None and xsec_name in previous.xsecs:
+            previous_xsec = previous.xsecs[xsec_name]
+            previous_spec = previous.build_record.get("xsec_dict", {}).get(
+                xsec_name, {}
+            )
+            if not (
+                np.allclose(previous_xsec["axis"], xsec["axis"])
+                and np.isclose(previous_xsec["distance"], xsec["distance"])
+                and previous_spec.get("deflection") == xsec.get("deflection")
+            ):
+                previous_xsec = None
+        if previous_xsec is None:
+            full_xsecs[xsec_name] = xsec
+        else:
+            partial_xsecs[xsec_name] = xsec
+    xsec_polygons = buildCrossSections(full_xsecs, built_parts_dict)
+    xsec_polygons.update(
+        buildCrossSections(
+            partial_xsecs,
+            {
+                label: built_part
+                for label, built_part in built_parts_dict.items()
+                if label not in unchanged
+            },
+        )
+    )
+    for xsec_name, xsec in opts["xsec_dict"].items():
+        axis = xsec["axis"]
+        distance = xsec["distance"]
+        if xsec_name in full_xsecs:
+            polygons = xsec_polygons[xsec_name]
+        else:
+            new_polygons = xsec_polygons[xsec_name]
+            # Keep the polygon order of a full build
+            polygons = {}
+            for label in built_parts_dict:
+                source = (
+                    previous.xsecs[xsec_name]["polygons"]
+                    if label in unchanged
+                    else new_polygons
+                )
+                pattern = re.compile(re.escape(label) + r"_\d+")
+                polygons.update(
+                    (name, polygon)
+                    for name, polygon in source.items()
+                    if pattern.fullmatch(name)
+                )
         geo.add_xsec(xsec_name, polygons, axis=axis, distance=distance)
 
+    if incremental:
+        geo.build_record = {
+            "template": templateKey(opts["serial_fcdoc"]),
+            "params": dict(opts.get("params", {})),
+            "order": [input_part.label for input_part in opts["input_parts"]],
+            "xsec_dict": deepcopy(opts["xsec_dict"]),
+            "parts": {
+                input_part.label: {
+                    "raw": raw_breps[input_part.label],
+                    "bounds": raw_bounds[input_part.label],
+                    "final": built_part.Shape.exportBrepToString(),
+                }
+                for input_part, built_part in zip(opts["input_parts"], built_parts)
+            },
+        }
+
     # Store the FreeCAD document
-    geo.set_data(doc)
+    geo.set_data(doc, compression=compression)
+    for output_part in geo.parts.values():
+        output_part.export_source = (geo.serial_fcdoc, compression, stl_options)
 
     return geo
 
@@ -390,6 +683,25 @@ def build_lithography(part, opts, info_holder):
     if DBG_OUT:
         FreeCAD.ActiveDocument.saveAs("tmp_after_init.fcstd")
     layer_num = part.layer_num
+    layer = info_holder.lithoDict["layers"][layer_num]
+    graph = litho_dependency_graph(
+        info_holder,
+        [
+            (layer_num, objID)
+            for objID in layer["objIDs"]
+            if layer["objIDs"][objID]["partName"] == part.fc_name
+        ],
+    )
+    pending = [node for node in graph if not litho_node_done(info_holder, node)]
+    logging.info(
+        "Lithography part %s: %d of %d graph nodes left to build",
+        part.label,
+        len(pending),
+        len(graph),
+    )
+    evaluate_litho_graph(
+        info_holder, opts, graph, max_workers=opts.get("litho_workers", 1)
+    )
     returnObjs = []
     for objID in info_holder.lithoDict["layers"][layer_num]["objIDs"]:
         if (
@@ -584,15 +896,15 @@ def makeSAG(sketch, zBot, zMid, zTop, tIn, tOut, offset=0.0):
     sketchList = splitSketch(sketch)
     returnParts = []
     for tempSketch in sketchList:
-        botSketch = draftOffset(tempSketch, offset)  # the base of the wire
-        midSketch = draftOffset(tempSketch, f + d - tIn)  # the base of the cap
+        # the base of the wire and the base of the cap
+        botSketch, midSketch = offsetSketch(tempSketch, [offset, f + d - tIn])
         top_offset = f - tIn
-        topSketch = draftOffset(tempSketch, top_offset)  # the top of the cap
-        # If topSketch has been shrunk exactly to a line or a point, relax the offset to 5E-5. Any closer and FreeCAD seems to suffer from numerical errors
-        if topSketch.Shape.Area == 0:
-            top_offset -= 5e-5
-            delete(topSketch)
-            topSketch = draftOffset(tempSketch, top_offset)
+        try:
+            topSketch = offsetSketch(tempSketch, top_offset)  # the top of the cap
+        except ValueError:
+            # The top has shrunk exactly to a line or a point, which the loft can't
+            # end on. Stop just short of the collapse instead.
+            topSketch = offsetSketch(tempSketch, top_offset * (1 - 1e-4))
 
         delete(tempSketch)  # remove the copied sketch part
         # Make the bottom wire:
@@ -737,9 +1049,181 @@ def initialize_lithography(info, opts, fillShells=True):
             layers[layer_num]["objIDs"][objID]["HDict"] = {}
 
 
-def gen_offset(opts, obj, offsetVal):
+def litho_dependency_graph(info, roots):
+    """Return the dependency graph of the lithography constructions.
+
+    The nodes are ("H", layer_num, objID, offsetTuple) for the H object lists of
+    `H_offset` and ("A", offsetTuple) for the offset substrate lists of
+    `screened_A_UnionList`, where offsetTuple is the key of the HDict or
+    substrate dictionary. Each node appears once, however many constructions
+    depend on it.
+
+    Parameters
+    ----------
+    info :
+
+    roots :
+        list of (layer_num, objID) pairs whose un-offset H objects are needed.
+
+    Returns
+    -------
+    dict mapping each node to the set of nodes it depends on.
+
+    """
+    layers = info.lithoDict["layers"]
+    graph = {}
+    stack = [("H", layer_num, objID, ()) for layer_num, objID in roots]
+    while stack:
+        node = stack.pop()
+        if node in graph:
+            continue
+        deps = set()
+        if node[0] == "H":
+            _, layer_num, _, checkOffsetTuple = node
+            offsetTuple = tuple(sorted(checkOffsetTuple + (layer_num,)))
+            # The un-offset substrate is not constructed
+            deps.update(("A", key) for key in (checkOffsetTuple, offsetTuple) if key)
+            for m in layers.keys():
+                if m < layer_num:  # then this is a lower layer
+                    for j in layers[m]["objIDs"].keys():
+                        deps.add(("H", m, j, checkOffsetTuple))
+                        deps.add(("H", m, j, offsetTuple))
+        graph[node] = deps
+        stack.extend(deps)
+    return graph
+
+
+def litho_node_done(info, node):
+    """Return whether a lithography graph node has already been constructed."""
+    if node[0] == "H":
+        _, layer_num, objID, offsetTuple = node
+        HDict = info.lithoDict["layers"][layer_num]["objIDs"][objID]["HDict"]
+        return offsetTuple in HDict
+    return node[1] in info.lithoDict["substrate"]
+
+
+def _litho_node_objects(info, node):
+    """Return the object list constructed for a lithography graph node."""
+    if node[0] == "H":
+        _, layer_num, objID, offsetTuple = node
+        return info.lithoDict["layers"][layer_num]["objIDs"][objID]["HDict"][
+            offsetTuple
+        ]
+    return info.lithoDict["substrate"][node[1]]
+
+
+def _set_litho_node_objects(info, node, objs):
+    """Store the object list constructed for a lithography graph node."""
+    if node[0] == "H":
+        _, layer_num, objID, offsetTuple = node
+        HDict = info.lithoDict["layers"][layer_num]["objIDs"][objID]["HDict"]
+        HDict[offsetTuple] = objs
+    else:
+        info.lithoDict["substrate"][node[1]] = objs
+
+
+def _eval_litho_node(info, opts, node):
+    """Construct a lithography graph node whose dependencies are constructed."""
+    if node[0] == "H":
+        _, layer_num, objID, offsetTuple = node
+        H_offset(info, opts, layer_num, objID, tList=list(offsetTuple))
+    else:
+        layers = info.lithoDict["layers"]
+        t = sum(layers[m]["thickness"] for m in node[1])
+        objs = []
+        for A in info.lithoDict["substrate"][()]:
+            objs.append(gen_offset(opts, A, t, trash=info.trash))
+        _set_litho_node_objects(info, node, objs)
+
+
+# State shared with the forked worker processes of evaluate_litho_graph
+_forkedLitho = {}
+
+
+def _litho_node_breps(node):
+    """Construct a lithography graph node in a forked worker process."""
+    info, opts = _forkedLitho["info"], _forkedLitho["opts"]
+    _eval_litho_node(info, opts, node)
+    return [obj.Shape.exportBrepToString() for obj in _litho_node_objects(info, node)]
+
+
+def evaluate_litho_graph(info, opts, graph, max_workers=1):
+    """Construct the nodes of a lithography dependency graph.
+
+    The nodes are constructed level by level, where each level only depends on the
+    previous ones. With more than one worker, the nodes of a level are constructed
+    in forked copies of this process, which see all previous levels, and the
+    resulting shapes are added to the document as Part::Feature objects. Platforms
+    without fork, and daemonic processes such as the workers of `Geo3DBuildPool`,
+    construct the nodes serially.
+
+    Parameters
+    ----------
+    info :
+
+    opts : dict
+        Options dict in the QMT Geometry3D.__init__ input format.
+
+    graph : dict
+        Graph returned by `litho_dependency_graph`.
+    max_workers : int
+        Number of worker processes. (Default value = 1)
+
+    Returns
+    -------
+    None
+
+    """
+    levels = {}
+    for root in graph:
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in levels:
+                stack.pop()
+                continue
+            missing = [dep for dep in graph[node] if dep not in levels]
+            if missing:
+                stack.extend(missing)
+            else:
+                levels[node] = 1 + max((levels[dep] for dep in graph[node]), default=-1)
+                stack.pop()
+    for level in range(max(levels.values(), default=-1) + 1):
+        nodes = sorted(
+            (
+                node
+                for node, nodeLevel in levels.items()
+                if nodeLevel == level and not litho_node_done(info, node)
+            ),
+            key=repr,
+        )
+        if max_workers <= 1 or len(nodes) <= 1 or not forkedWorkersAvailable():
+            for node in nodes:
+                _eval_litho_node(info, opts, node)
+            continue
+        _forkedLitho.update(info=info, opts=opts)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(nodes)),
+                mp_context=multiprocessing.get_context("fork"),
+            ) as pool:
+                results = list(pool.map(_litho_node_breps, nodes))
+        finally:
+            _forkedLitho.clear()
+        doc = FreeCAD.ActiveDocument
+        for node, breps in zip(nodes, results):
+            objs = [add_brep_feature(doc, f"litho_{node[0]}", brep) for brep in breps]
+            info.trash += objs
+            _set_litho_node_objects(info, node, objs)
+
+
+def gen_offset(opts, obj, offsetVal, trash=None):
     """Generates an offset non-destructively.
 
+    Offsets are memoized in opts["offset_cache"] for the duration of a build, so
+    the same offset object is returned when obj is offset by the same value again.
+    Callers must therefore not modify or delete the returned object.
+
     Parameters
     ----------
     opts : dict
@@ -747,28 +1231,51 @@ def gen_offset(opts, obj, offsetVal):
 
     obj : FreeCAD.App.Document
         A FreeCAD object.
-    offsetVal :
-
+    offsetVal : float
+        Offset distance.
+    trash : list
+        List of objects to delete after the build. Newly generated offsets are
+        appended to it, cached ones are already in it.
+        (Default value = None)
 
     Returns
     -------
-
+    The offset object.
 
     """
     doc = FreeCAD.ActiveDocument
+    cache = opts.setdefault("offset_cache", {})
+    # Objects are identified by their Python wrappers rather than their names,
+    # which FreeCAD hands out again once an object is deleted. The cache entry
+    # holds on to obj, so its id can't be reused. Thicknesses are summed in a
+    # fixed order, but guard against rounding noise.
+    key = (id(obj), round(offsetVal, 12))
+    if key in cache:
+        source, offsetDupe = cache[key]
+        try:
+            alive = doc.getObject(offsetDupe.Name) is offsetDupe
+        except ReferenceError:  # attribute access of a deleted object
+            alive = False
+        if source is obj and alive:
+            logging.debug(
+                "%s (%s) -> %s (%s) [cached]",
+                obj.Name,
+                obj.Label,
+                offsetDupe.Name,
+                offsetDupe.Label,
+            )
+            return offsetDupe
     # First, we need to identify if we are working with a special part:
-    my_part_label = None
-    for part_label in opts["built_part_names"]:  # Loop through built parts
-        built_part_name = opts["built_part_names"][part_label]  # Part name
-        if built_part_name == obj.Name:  # Is this the part we're working with now?
-            my_part_label = part_label  # If so, set the label
-            break
-    if my_part_label is None:  # If we haven't found the part, it's not special
+    if "built_part_inputs" not in opts:
+        opts["built_part_inputs"] = {}
+        for input_part in opts.get("input_parts", []):
+            built_part_name = opts.get("built_part_names", {}).get(input_part.label)
+            if built_part_name is not None:
+                opts["built_part_inputs"][built_part_name] = input_part
+    input_part = opts["built_part_inputs"].get(obj.Name)
+    if input_part is None:  # If we haven't found the part, it's not special
         treatment = "standard"
     else:  # If we have, figure out which class we used to make it
-        for input_part in opts["input_parts"]:
-            if input_part.label == part_label:
-                break
         treatment = type(input_part)
     # Extrude or lithography parts are treated normally:
     if treatment == part_3d.ExtrudePart or treatment == part_3d.LithographyPart:
@@ -794,8 +1301,11 @@ def gen_offset(opts, obj, offsetVal):
     elif treatment == part_3d.SAGPart:
         offsetDupe = build_sag(input_part, offset=offsetVal)
     doc.recompute()
+    cache[key] = (obj, offsetDupe)
+    if trash is not None:
+        trash.append(offsetDupe)
 
-    try:
+    if input_part is not None:
         logging.debug(
             "%s (%s) -> %s (%s) [from %s]",
             obj.Name,
@@ -804,7 +1314,7 @@ def gen_offset(opts, obj, offsetVal):
             offsetDupe.Label,
             input_part.label,
         )
-    except:
+    else:
         logging.debug(
             "%s (%s) -> %s (%s)", obj.Name, obj.Label, offsetDupe.Name, offsetDupe.Label
         )
@@ -863,15 +1373,19 @@ def screened_H_union_list(info, opts, obj, m, j, offsetTuple, checkOffsetTuple):
     HObjCheckList = HDict[checkOffsetTuple]
     HObjList = HDict[offsetTuple]
 
-    returnList = []
+    included = []
     for i, HObjPart in enumerate(HObjCheckList):
-        if checkOverlap([obj, HObjPart]):  # if we need to include an overlap
-            returnList.append(HObjList[i])
+        # if we need to include an overlap
+        if checkOverlap([obj, HObjPart], cache=info.overlapCache):
+            included.append(i)
 
     # fix for multilayer intersections: make sure we really check all overlaps
     for i, HObjPart in enumerate(HObjList):
-        if checkOverlap([obj, HObjPart]):  # if we need to include an overlap
-            returnList.append(HObjList[i])
+        if i in included:  # no need to add it twice
+            continue
+        if checkOverlap([obj, HObjPart], cache=info.overlapCache):
+            included.append(i)
+    returnList = [HObjList[i] for i in included]
 
     logging.debug("<<< %s", [f"{o.Name} ({o.Label})" for o in returnList])
     return returnList
@@ -909,19 +1423,17 @@ def screened_A_UnionList(info, opts, obj, t, ti, offsetTuple, checkOffsetTuple):
     if checkOffsetTuple not in info.lithoDict["substrate"]:
         info.lithoDict["substrate"][checkOffsetTuple] = []
         for A in info.lithoDict["substrate"][()]:
-            AObj = gen_offset(opts, A, t)
-            info.trash.append(AObj)
+            AObj = gen_offset(opts, A, t, trash=info.trash)
             info.lithoDict["substrate"][checkOffsetTuple].append(AObj)
     if offsetTuple not in info.lithoDict["substrate"]:
         info.lithoDict["substrate"][offsetTuple] = []
         for A in info.lithoDict["substrate"][()]:
-            AObj = gen_offset(opts, A, t + ti)
-            info.trash.append(AObj)
+            AObj = gen_offset(opts, A, t + ti, trash=info.trash)
             info.lithoDict["substrate"][offsetTuple].append(AObj)
 
     returnList = []
     for i, ACheck in enumerate(info.lithoDict["substrate"][checkOffsetTuple]):
-        if checkOverlap([obj, ACheck]):
+        if checkOverlap([obj, ACheck], cache=info.overlapCache):
             returnList.append(info.lithoDict["substrate"][offsetTuple][i])
 
     logging.debug("<<< %s", [f"{o.Name} ({o.Label})" for o in returnList])
@@ -983,10 +1495,8 @@ def H_offset(info, opts, layer_num, objID, tList=[]):
     B = layers[layer_num]["objIDs"][objID]["B"]
     # C prism for this layer & ObjID
     C = layers[layer_num]["objIDs"][objID]["C"]
-    B_t = gen_offset(opts, B, t)  # offset the B prism
-    C_t = gen_offset(opts, C, t)  # offset the C prism
-    info.trash.append(B_t)
-    info.trash.append(C_t)
+    B_t = gen_offset(opts, B, t, trash=info.trash)  # offset the B prism
+    C_t = gen_offset(opts, C, t, trash=info.trash)  # offset the C prism
 
     # Build up the substrate due to previously deposited gates
     HOffsetList = []
@@ -1049,11 +1559,11 @@ def gen_U(info, layer_num, objID):
                 if "G" not in layers[layer_num]["objIDs"][objID]:
                     gen_G(info, m, j)
                 G = layers[layer_num]["objIDs"][objID]["G"]
-                if checkOverlap([B, G]):
+                if checkOverlap([B, G], cache=info.overlapCache):
                     GList.append(G)
     AList = []
     for A in info.lithoDict["substrate"][()]:
-        if checkOverlap([B, A]):
+        if checkOverlap([B, A], cache=info.overlapCache):
             AList.append(A)
     unionList = GList + AList
     unionObj = genUnion(unionList, consumeInputs=False)
@@ -1158,14 +1668,10 @@ def collect_garbage(info):
 
 
     """
-    for obj in info.trash:
-        try:
-            delete(obj)
-        except BaseException:
-            pass
+    batch_delete(info.trash)
 
 
-def buildCrossSection(sliceName, axis, distance, built_parts_dict):
+def buildCrossSection(sliceName, axis, distance, built_parts_dict, deflection=None):
     """Render the 2D objects required for cross-sections.
 
     Parameters
@@ -1178,24 +1684,52 @@ def buildCrossSection(sliceName, axis, distance, built_parts_dict):
 
     built_parts_dict : dict
 
+    deflection : float
+        Maximum distance between curved edges and the polygon segments. If None,
+        curved edges are replaced by the segment between their end points.
+        (Default value = None)
 
     Returns
     -------
 
 
     """
-    polygons = {}
-    for part_name in built_parts_dict:
-        built_part = built_parts_dict[part_name]
-        # loop over FreeCAD shapes corresponding to part
-        # slice the 3D part
-        fcName = f"{part_name}_section_{sliceName}"
-        section = crossSection(built_part, axis=axis, d=distance, name=fcName)
-        # separate disjoint pieces
-        segments, cycles = findEdgeCycles(section)
-        for i, cycle in enumerate(cycles):
-            points = [tuple(segments[idx, 0]) for idx in cycle]
-            patchName = f"{part_name}_{i}"
-            # this mapping is necessary since numpy floats have a pickle error:
-            polygons[patchName] = [list(map(float, point)) for point in points]
+    xsec = {"axis": axis, "distance": distance, "deflection": deflection}
+    return buildCrossSections({sliceName: xsec}, built_parts_dict)[sliceName]
+
+
+def buildCrossSections(xsec_dict, built_parts_dict):
+    """Compute the polygons of several cross sections in one pass over the parts.
+
+    The parts are sliced directly, without adding objects to the document or
+    recomputing it.
+
+    Parameters
+    ----------
+    xsec_dict : dict
+        Cross-section specifications with "axis", "distance" and optionally
+        "deflection" entries, see `buildCrossSection`.
+    built_parts_dict : dict
+        Built FreeCAD objects keyed by part label.
+
+    Returns
+    -------
+    dict mapping the cross-section names to dicts of polygons.
+
+    """
+    polygons = {xsec_name: {} for xsec_name in xsec_dict}
+    for part_name, built_part in built_parts_dict.items():
+        shape = built_part.Shape  # get the shape once for all cross sections
+        for xsec_name, xsec in xsec_dict.items():
+            rings = sectionRings(
+                shape,
+                axis=xsec["axis"],
+                d=xsec["distance"],
+                deflection=xsec.get("deflection", None),
+            )
+            # separate disjoint pieces
+            for i, ring in enumerate(rings):
+                patchName = f"{part_name}_{i}"
+                # tolist is necessary since numpy floats have a pickle error:
+                polygons[xsec_name][patchName] = ring.tolist()
     return polygons
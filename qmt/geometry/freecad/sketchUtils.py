@@ -41,6 +41,43 @@ def findSegments(sketch):
     return np.array(lineSegments)
 
 
+def wireSegments(wires, deflection=None):
+    """Return line segments approximating a collection of wires as a numpy array.
+
+    Straight edges give one segment between their end points, like in
+    `findSegments`. Curved edges are discretized so that the segments deviate at
+    most `deflection` from the curve.
+
+    Parameters
+    ----------
+    wires :
+        list of Part.Wire objects.
+    deflection : float
+        Maximum distance between curved edges and their segments. If None, curved
+        edges are replaced by the segment between their end points.
+        (Default value = None)
+
+    Returns
+    -------
+    A `np.ndarray` with [lineSegmentIndex,start/end point,coordinate].
+
+    """
+    lineSegments = []
+    for wire in wires:
+        for edge in wire.Edges:
+            start = edge.Vertexes[0].Point
+            if deflection is None or isinstance(edge.Curve, Part.Line):
+                points = [start, edge.Vertexes[-1].Point]
+            else:
+                points = edge.discretize(Deflection=deflection)
+                # follow the vertex order, as for straight edges
+                if (points[-1] - start).Length < (points[0] - start).Length:
+                    points.reverse()
+            for point0, point1 in zip(points[:-1], points[1:]):
+                lineSegments.append([tuple(point0), tuple(point1)])
+    return np.array(lineSegments, dtype=float).reshape(-1, 2, 3)
+
+
 def nextSegment(lineSegments, segIndex, tol=1e-8, fixOrder=True):
     """Return the next line segment index in a collection of tuples defining
     several cycles. WARNING: this will by default fixOrder, i.e. side effects on
@@ -123,6 +160,108 @@ def findCycle(lineSegments, startingIndex, availSegIDs):
     return segList
 
 
+def findCycles(lineSegments, tol=1e-8, fixOrder=True):
+    """Separate a collection of line segments into cycles.
+
+    Coincident endpoints are found with a KD-tree, so this runs in O(n log n) for n
+    segments, rather than scanning all segments for every step as `nextSegment`
+    does. The cycles are the same as those found by repeated `findCycle` calls:
+    each starts at the lowest segment index not in a previous cycle and follows the
+    end point of that segment. WARNING: this will by default fixOrder, i.e. side
+    effects on the caller.
+
+    Parameters
+    ----------
+    lineSegments :
+        ndarray with [lineSegmentIndex,start/end point,coordinate]
+    tol :
+        repair tolerance for matching (Default value = 1e-8)
+    fixOrder :
+        whether the order lineSegments should be repaired on the fly (Default value = True)
+
+    Returns
+    -------
+    List of cycles, each a list of segment indices.
+
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from scipy.spatial import cKDTree
+
+    numSegs = lineSegments.shape[0]
+    if numSegs == 0:
+        return []
+    # Endpoint 2 * i is the start and 2 * i + 1 the end of segment i
+    endpoints = lineSegments.reshape(2 * numSegs, -1)
+    pairs = cKDTree(endpoints).query_pairs(tol, p=1, output_type="ndarray")
+    graph = coo_matrix(
+        (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+        shape=(2 * numSegs, 2 * numSegs),
+    )
+    _, nodes = connected_components(graph, directed=False)
+    counts = np.bincount(nodes)
+    if np.any(counts > 2):
+        raise ValueError(
+            "Multiple possible paths found while parsing cycles in sketch."
+        )
+    elif np.any(counts < 2):
+        raise ValueError("No paths found while parsing cycles in sketch.")
+    # Pair up the two endpoints at every vertex
+    order = np.argsort(nodes, kind="stable")
+    partner = np.empty(2 * numSegs, dtype=int)
+    partner[order[0::2]] = order[1::2]
+    partner[order[1::2]] = order[0::2]
+    if np.any(partner // 2 == np.arange(2 * numSegs) // 2):
+        raise ValueError("Degenerate segment found while parsing cycles in sketch.")
+
+    flipped = np.zeros(numSegs, dtype=bool)
+    visited = np.zeros(numSegs, dtype=bool)
+    cycles = []
+    for startingIndex in range(numSegs):
+        if visited[startingIndex]:
+            continue
+        visited[startingIndex] = True
+        cycle = [startingIndex]
+        endpoint = 2 * startingIndex + 1
+        while True:
+            nextEndpoint = partner[endpoint]
+            currentIndex = nextEndpoint // 2
+            if currentIndex == startingIndex:
+                break
+            visited[currentIndex] = True
+            cycle.append(currentIndex)
+            if nextEndpoint % 2:
+                # the points were out of order, so they need to be switched
+                flipped[currentIndex] = True
+                endpoint = nextEndpoint - 1
+            else:
+                endpoint = nextEndpoint + 1
+        cycles.append(cycle)
+    if fixOrder:
+        lineSegments[flipped] = lineSegments[flipped, ::-1]
+    return cycles
+
+
+def cycleRings(lineSegments, cycles):
+    """Return the vertices of cycles of line segments as closed rings.
+
+    Parameters
+    ----------
+    lineSegments :
+        ndarray with [lineSegmentIndex,start/end point,coordinate], with the
+        segment order fixed, see `findCycles`.
+    cycles :
+        list of cycles, each a list of segment indices.
+
+    Returns
+    -------
+    List of ndarrays with [vertexIndex,coordinate], the start points of the cycle
+    segments in order.
+
+    """
+    return [lineSegments[cycle, 0, :] for cycle in cycles]
+
+
 # ~ def findCycle2(sketch, lineSegments, idx):
 # ~ '''Find a cycle in a collection of line segments given a starting index.
 # ~ Return the list of indices in the cycle.
@@ -224,15 +363,7 @@ def findEdgeCycles(sketch):  # TODO: port objectConstruction crossection stuff
     """
     lineSegments = findSegments(sketch)
     # Next, detect cycles:
-    availSegIDs = range(lineSegments.shape[0])
-    cycles = []
-    for _ in range(lineSegments.shape[0]):
-        if len(availSegIDs) <= 0:
-            break
-        startingIndex = availSegIDs[0]
-        newCycle = findCycle(lineSegments, startingIndex, availSegIDs)
-        cycles += [newCycle]
-        availSegIDs = [item for item in availSegIDs if item not in newCycle]
+    cycles = findCycles(lineSegments)
     return lineSegments, cycles
 
 
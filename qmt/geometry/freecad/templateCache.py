@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Warm template documents for repeated builds in long-lived processes."""
+
+import hashlib
+import logging
+from collections import OrderedDict
+
+import FreeCAD
+
+from qmt.infrastructure import load_serial
+
+# Maximum number of template documents kept open per process
+MAX_TEMPLATES = 4
+
+# template key -> (document name, state of the pristine template, see _templateState)
+_templateDocs = OrderedDict()
+
+
+def templateKey(serial_fcdoc):
+    """Return the cache key of a serialized template.
+
+    Parameters
+    ----------
+    serial_fcdoc : str or bytes-like
+        Serialized FreeCAD template.
+
+    Returns
+    -------
+    key : str
+
+    """
+    data = serial_fcdoc.encode() if isinstance(serial_fcdoc, str) else serial_fcdoc
+    return hashlib.sha256(data).hexdigest()
+
+
+def _templateState(doc):
+    """Fingerprint of a document: a digest of the properties of every object.
+
+    This covers sketch geometry and spreadsheet cells (i.e. model parameters) as
+    well as the set of objects, so any change that escaped a rollback shows up.
+    """
+    return {
+        obj.Name: hashlib.sha256(obj.Content.encode()).hexdigest()
+        for obj in doc.Objects
+    }
+
+
+def closeTemplate(key):
+    """Close a cached template document and forget about it.
+
+    Parameters
+    ----------
+    key : str
+        Key returned by `templateKey`.
+
+    Returns
+    -------
+    None
+
+    """
+    docName, _ = _templateDocs.pop(key)
+    if docName in FreeCAD.listDocuments():
+        FreeCAD.closeDocument(docName)
+
+
+def getTemplateDoc(serial_fcdoc):
+    """Return the open template document for a serialized template.
+
+    The template is only parsed on first use in this process. Documents are opened
+    with undo enabled so that builds can be rolled back, see `buildWithTemplate`.
+    A cached document whose state differs from the pristine template is reloaded.
+    The least recently used document is closed once more than `MAX_TEMPLATES` are
+    open.
+
+    Parameters
+    ----------
+    serial_fcdoc : str or bytes-like
+        Serialized FreeCAD template.
+
+    Returns
+    -------
+    doc : FreeCAD.App.Document
+
+    """
+    key = templateKey(serial_fcdoc)
+    if key in _templateDocs:
+        _templateDocs.move_to_end(key)
+        docName, state = _templateDocs[key]
+        if docName not in FreeCAD.listDocuments():
+            del _templateDocs[key]  # closed behind our back
+        elif _templateState(FreeCAD.getDocument(docName)) == state:
+            return FreeCAD.getDocument(docName)
+        else:
+            logging.warning("Template was modified outside of a build, reloading it.")
+            closeTemplate(key)
+
+    def _load_fct(path):
+        doc = FreeCAD.newDocument("template_" + key[:12])
+        doc.load(path)
+        return doc
+
+    doc = load_serial(serial_fcdoc, _load_fct, "fcstd")
+    doc.UndoMode = 1
+    doc.recompute()
+    _templateDocs[key] = (doc.Name, _templateState(doc))
+    while len(_templateDocs) > MAX_TEMPLATES:
+        closeTemplate(next(iter(_templateDocs)))
+    return doc
+
+
+def buildWithTemplate(opts):
+    """Build the 3D geometry in a warm template document.
+
+    Instead of loading a fresh copy of the template, the build runs inside a
+    transaction on the cached template document, which is rolled back afterwards.
+    Should the rollback not restore the template's objects and their properties,
+    including sketch geometry and model parameters, the document is dropped from
+    the cache and the next build loads it again. Every build thus starts from the
+    template's own parameter values, also when no params are given.
+
+    Parameters
+    ----------
+    opts : dict
+        Options dict as passed to `objectConstruction.build`.
+
+    Returns
+    -------
+    Geo3DData object.
+
+    """
+    from qmt.geometry.freecad.objectConstruction import build
+
+    key = templateKey(opts["serial_fcdoc"])
+    doc = getTemplateDoc(opts["serial_fcdoc"])
+    FreeCAD.setActiveDocument(doc.Name)
+    doc.openTransaction("qmt build")
+    try:
+        return build(opts)
+    finally:
+        doc.abortTransaction()
+        doc.recompute()
+        if _templateState(doc) != _templateDocs[key][1]:
+            logging.warning("Template rollback failed, reloading it on next use.")
+            closeTemplate(key)
@@ -2,18 +2,29 @@
 Contains the Geo3DData class, which is used to describe a 3D geometry
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from qmt.infrastructure import load_serial, store_serial, write_deserialised
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from .part_3d import Geo3DPart
 import numpy as np
 import FreeCAD
 import Part
 from FreeCAD import Base
 from shapely.geometry import LineString, MultiLineString, Polygon
+from shapely.strtree import STRtree
+from shapely.vectorized import contains
 from .geo_2d_data import Geo2DData
+from .part_map import Geo3DPartMap
 from .geo_data_base import GeoData
 
 
+def _check_cavity_detection(cavity_detection: str):
+    if cavity_detection not in ("nesting", "solid"):
+        raise ValueError(
+            f"Unknown cavity detection {cavity_detection}, use nesting or solid."
+        )
+
+
 class Geo3DData(GeoData):
     """Class for a 3D geometry specification. It holds:
         - parts is a dict of Part3D objects, keyed by the label of each Part3D object
@@ -26,7 +37,11 @@ class Geo3DData(GeoData):
         # A cross section is a dict with axis and distance fields
         # E.g. xsec_dict={"test_xsec": {"axis": (1, 0, 0), "distance": 0}}
         self.xsecs: Dict[str, Dict] = {}
-        self.serial_fcdoc: str = None  # serialized FreeCAD document for this geometry
+        # serialized FreeCAD document for this geometry
+        self.serial_fcdoc: Union[str, bytes] = None
+        # Inputs and BREP shapes of an incremental build, used to rebuild only the
+        # parts affected by changes. This gets set on geometry build.
+        self.build_record: Optional[Dict] = None
 
     def add_part(self, part_name: str, part: Geo3DPart, overwrite: bool = False):
         """Add a part to this geometry.
@@ -103,7 +118,12 @@ class Geo3DData(GeoData):
             "polygons": polygons,
         }
 
-    def set_data(self, data: Any, scratch_dir: Optional[str] = None):
+    def set_data(
+        self,
+        data: Any,
+        scratch_dir: Optional[str] = None,
+        compression: Optional[str] = None,
+    ):
         """Set data to a serial format that is easily portable.
 
         Parameters
@@ -112,6 +132,9 @@ class Geo3DData(GeoData):
             The corresponding data that we would like to set.
         scratch_dir : str
             Optional existing temporary (fast) storage location. (Default value = None)
+        compression : str
+            Optional compression of the binary blob, "zstd" or "lz4".
+            (Default value = None)
         Returns
         -------
         None
@@ -121,7 +144,12 @@ class Geo3DData(GeoData):
             doc.saveAs(path)
 
         self.serial_fcdoc = store_serial(
-            data, _save_fct, "fcstd", scratch_dir=scratch_dir
+            data,
+            _save_fct,
+            "fcstd",
+            scratch_dir=scratch_dir,
+            binary=True,
+            compression=compression,
         )
 
     def get_data(self, data_name: str, scratch_dir: Optional[str] = None):
@@ -173,7 +201,147 @@ class Geo3DData(GeoData):
         write_deserialised(self.serial_fcdoc, file_path)
         return file_path
 
-    def xsec_to_2d(self, xsec_name: str, lunit: Optional[str] = None) -> Geo2DData:
+    def export_parts(self, formats: Sequence[str] = ("stp", "stl")):
+        """Generate the part exports that were not made during the geometry build.
+
+        Unlike `Geo3DPart.get_serial`, this loads the FreeCAD document only once for
+        all parts.
+
+        Parameters
+        ----------
+        formats : sequence of str
+            Export formats, any of "stp" and "stl". (Default value = ("stp", "stl"))
+        Returns
+        -------
+        None
+
+        """
+        from qmt.geometry.freecad.fileIO import exportFromSerialDoc
+
+        # Parts of the same build share the serialized document
+        by_source = {}
+        for label, part in self.parts.items():
+            missing = [fmt for fmt in formats if getattr(part, "serial_" + fmt) is None]
+            if missing and getattr(part, "export_source", None) is not None:
+                _, fc_names, missing_formats = by_source.setdefault(
+                    id(part.export_source[0]), (part.export_source, {}, set())
+                )
+                fc_names[label] = part.built_fc_name
+                missing_formats.update(missing)
+        for export_source, fc_names, missing_formats in by_source.values():
+            serial_fcdoc, compression, stl_options = export_source
+            exports = exportFromSerialDoc(
+                serial_fcdoc,
+                fc_names,
+                sorted(missing_formats),
+                compression,
+                meshOptions=stl_options,
+            )
+            for label, serials in exports.items():
+                for fmt, serial in serials.items():
+                    if getattr(self.parts[label], "serial_" + fmt) is None:
+                        setattr(self.parts[label], "serial_" + fmt, serial)
+
+    def rasterize(
+        self,
+        spacing: Union[float, Sequence[float]],
+        include_virtual: bool = False,
+        bounds: Optional[Sequence[float]] = None,
+    ) -> Geo3DPartMap:
+        """Rasterize the built parts onto a regular voxel grid.
+
+        Each cell is labelled by the part containing its center. Instead of testing
+        every cell against the 3D solids, each part is sliced once per z layer of
+        cell centers and the layer is classified with a vectorized 2D point in
+        polygon test (even-odd rule, so cavities are handled). Overlaps are resolved
+        by the build order, i.e. the leftmost part wins.
+
+        Parameters
+        ----------
+        spacing : float or Sequence[float]
+            Cell extent, either the same for all axes or one value per axis.
+        include_virtual : bool
+            Whether virtual parts are rasterized as well.
+            (Default value = False)
+        bounds : Sequence[float]
+            Grid extent as [x_min, x_max, y_min, y_max, z_min, z_max]. If None, the
+            bounding box of the rasterized parts is used.
+            (Default value = None)
+        Returns
+        -------
+        Geo3DPartMap holding the integer label grid.
+
+        """
+        spacing = np.broadcast_to(np.asarray(spacing, dtype=float), (3,))
+        part_names = [
+            name
+            for name in self.build_order
+            if include_virtual or not self.parts[name].virtual
+        ]
+        doc = self.get_data("fcdoc")
+        try:
+            shapes = [
+                doc.getObject(self.parts[name].built_fc_name).Shape
+                for name in part_names
+            ]
+            if bounds is None:
+                total_bb = FreeCAD.BoundBox()
+                for shape in shapes:
+                    total_bb.add(shape.BoundBox)
+                bounds = [
+                    total_bb.XMin,
+                    total_bb.XMax,
+                    total_bb.YMin,
+                    total_bb.YMax,
+                    total_bb.ZMin,
+                    total_bb.ZMax,
+                ]
+            lower = np.array(bounds[0::2], dtype=float)
+            upper = np.array(bounds[1::2], dtype=float)
+            grid_shape = np.maximum(np.ceil((upper - lower) / spacing), 1).astype(int)
+            centers = [
+                lower[i] + (np.arange(grid_shape[i]) + 0.5) * spacing[i]
+                for i in range(3)
+            ]
+            label_type = (
+                np.int16 if len(part_names) < np.iinfo(np.int16).max else np.int32
+            )
+            labels = np.full(grid_shape, -1, dtype=label_type)
+            deflection = 0.1 * min(spacing[0], spacing[1])
+
+            for index, shape in enumerate(shapes):
+                bb = shape.BoundBox
+                ix = np.flatnonzero((centers[0] >= bb.XMin) & (centers[0] <= bb.XMax))
+                iy = np.flatnonzero((centers[1] >= bb.YMin) & (centers[1] <= bb.YMax))
+                iz = np.flatnonzero((centers[2] >= bb.ZMin) & (centers[2] <= bb.ZMax))
+                if not (len(ix) and len(iy) and len(iz)):
+                    continue
+                x, y = np.meshgrid(centers[0][ix], centers[1][iy], indexing="ij")
+                for k in iz:
+                    wires = shape.slice(Base.Vector(0, 0, 1), centers[2][k])
+                    inside = np.zeros(x.shape, dtype=bool)
+                    for wire in wires:
+                        ring = [
+                            (v.x, v.y) for v in wire.discretize(Deflection=deflection)
+                        ]
+                        if len(ring) >= 3:
+                            inside ^= contains(Polygon(ring), x, y)
+                    cells = (ix[:, np.newaxis], iy[np.newaxis, :], k)
+                    layer = labels[cells]
+                    # Parts earlier in the build order take priority
+                    layer[inside & (layer < 0)] = index
+                    labels[cells] = layer
+        finally:
+            FreeCAD.closeDocument(doc.Name)
+
+        return Geo3DPartMap(labels, lower, spacing, part_names)
+
+    def xsec_to_2d(
+        self,
+        xsec_name: str,
+        lunit: Optional[str] = None,
+        cavity_detection: str = "nesting",
+    ) -> Geo2DData:
         """Generates a Geo2DData from a cross section
 
         Parameters
@@ -182,11 +350,221 @@ class Geo3DData(GeoData):
             Name of the cross section
         lunit : Optional[str] :
             (Default value = None)
+        cavity_detection : str
+            How polygons enclosed by other polygons of the same part are classified
+            as cavities or material, see `xsecs_to_2d`.
+            (Default value = "nesting")
         Returns
         -------
         None
 
         """
+        return self.xsecs_to_2d([xsec_name], lunit, cavity_detection)[xsec_name]
+
+    def xsecs_to_2d(
+        self,
+        xsec_names: Optional[Sequence[str]] = None,
+        lunit: Optional[str] = None,
+        cavity_detection: str = "nesting",
+    ) -> Dict[str, Geo2DData]:
+        """Generates Geo2DData objects from several cross sections.
+
+        Parameters
+        ----------
+        xsec_names : Sequence[str]
+            Names of the cross sections. If None, all cross sections are converted.
+            (Default value = None)
+        lunit : Optional[str] :
+            (Default value = None)
+        cavity_detection : str
+            "nesting" decides from the number of enclosing polygons of the same part
+            whether a polygon is material (even) or a cavity (odd), which holds for
+            sections of valid solids and needs no FreeCAD document. "solid" tests a
+            point of each polygon against the 3D part instead, loading the FreeCAD
+            document once for all cross sections.
+            (Default value = "nesting")
+        Returns
+        -------
+        Dict of Geo2DData keyed by cross-section name.
+
+        """
+        if xsec_names is None:
+            xsec_names = list(self.xsecs)
+        doc = self._cavity_detection_doc(cavity_detection)
+        solids = {}
+        try:
+            return {
+                xsec_name: self._polygons_to_2d(
+                    self.xsecs[xsec_name]["polygons"],
+                    self.xsecs[xsec_name]["axis"],
+                    self.xsecs[xsec_name]["distance"],
+                    lunit,
+                    doc,
+                    solids,
+                )
+                for xsec_name in xsec_names
+            }
+        finally:
+            if doc is not None:
+                # Clean up freecad document
+                FreeCAD.closeDocument(doc.Name)
+
+    def _cavity_detection_doc(self, cavity_detection: str):
+        """Return the document needed by a cavity detection method, or None."""
+        _check_cavity_detection(cavity_detection)
+        return self.get_data("fcdoc") if cavity_detection == "solid" else None
+
+    def xsec_sweep(
+        self,
+        distances: Sequence[float],
+        axis: Tuple[float, float, float] = (1.0, 0.0, 0.0),
+        deflection: Optional[float] = None,
+        lunit: Optional[str] = None,
+        max_workers: int = 1,
+        cavity_detection: str = "nesting",
+    ) -> List[Geo2DData]:
+        """Generates Geo2DData objects for a stack of parallel cross sections.
+
+        Unlike `xsec_to_2d`, the cross sections do not need to be requested at build
+        time. Each process loads the FreeCAD document once and slices the part shapes
+        directly for all of its planes.
+
+        Parameters
+        ----------
+        distances : Sequence[float]
+            Distances along the axis of the cross-section planes.
+        axis : tuple
+            Normal of the cross-section planes, a unit vector.
+            (Default value = (1.0, 0.0, 0.0))
+        deflection : float
+            Maximum distance between curved edges and the polygon segments. If None,
+            curved edges are replaced by their chords.
+            (Default value = None)
+        lunit : Optional[str] :
+            (Default value = None)
+        max_workers : int
+            Number of processes the planes are distributed over.
+            (Default value = 1)
+        cavity_detection : str
+            Classification of enclosed polygons, see `xsecs_to_2d`.
+            (Default value = "nesting")
+        Returns
+        -------
+        List of Geo2DData, one per distance.
+
+        """
+        if not np.isclose(np.linalg.norm(axis), 1):
+            raise ValueError("Given axis is not a unit vector")
+        _check_cavity_detection(cavity_detection)
+        distances = [float(distance) for distance in distances]
+        if max_workers <= 1 or len(distances) <= 1:
+            return self._xsec_sweep_chunk(
+                distances, axis, deflection, lunit, cavity_detection
+            )
+        chunks = np.array_split(distances, min(max_workers, len(distances)))
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [
+                pool.submit(
+                    self._xsec_sweep_chunk,
+                    chunk.tolist(),
+                    axis,
+                    deflection,
+                    lunit,
+                    cavity_detection,
+                )
+                for chunk in chunks
+            ]
+            return [geo_2d for future in futures for geo_2d in future.result()]
+
+    def _xsec_sweep_chunk(
+        self,
+        distances: List[float],
+        axis: Tuple[float, float, float],
+        deflection: Optional[float],
+        lunit: Optional[str],
+        cavity_detection: str,
+    ) -> List[Geo2DData]:
+        """Implementation of xsec_sweep for the planes handled by one process."""
+        from qmt.geometry.freecad.geomUtils import sectionRings
+
+        doc = self.get_data("fcdoc")
+        try:
+            shapes = {
+                name: doc.getObject(self.parts[name].built_fc_name).Shape
+                for name in self.build_order
+            }
+            # Range of every part along the axis, from its bounding box corners
+            extents = {}
+            for name, shape in shapes.items():
+                bb = shape.BoundBox
+                corners = np.array(
+                    np.meshgrid(
+                        [bb.XMin, bb.XMax], [bb.YMin, bb.YMax], [bb.ZMin, bb.ZMax]
+                    )
+                ).reshape(3, -1)
+                projections = np.dot(axis, corners)
+                extents[name] = (projections.min(), projections.max())
+            solids = {}
+            geos_2d = []
+            for distance in distances:
+                polygons = {}
+                for name, shape in shapes.items():
+                    if not extents[name][0] <= distance <= extents[name][1]:
+                        continue
+                    rings = sectionRings(shape, axis, distance, deflection)
+                    for i, ring in enumerate(rings):
+                        polygons[f"{name}_{i}"] = ring.tolist()
+                geos_2d.append(
+                    self._polygons_to_2d(
+                        polygons,
+                        axis,
+                        distance,
+                        lunit,
+                        doc if cavity_detection == "solid" else None,
+                        solids,
+                    )
+                )
+            return geos_2d
+        finally:
+            FreeCAD.closeDocument(doc.Name)
+
+    def _polygons_to_2d(
+        self,
+        xsec_polygons: Dict[str, List[List[float]]],
+        axis: Tuple[float, float, float],
+        distance: float,
+        lunit: Optional[str] = None,
+        doc=None,
+        solids: Optional[Dict] = None,
+    ) -> Geo2DData:
+        """Generates a Geo2DData from cross-section polygons.
+
+        Parameters
+        ----------
+        xsec_polygons : dict
+            Cross-section polygons in 3D coordinates, keyed by part label and index.
+        axis : tuple
+            Normal of the cross-section plane.
+        distance : float
+            Distance of the cross-section plane along the axis.
+        lunit : Optional[str] :
+            (Default value = None)
+        doc : FreeCAD.App.Document
+            Loaded FreeCAD document of this geometry, used to detect cavities with
+            point in solid tests. If None, cavities are detected from the nesting
+            depth of the polygons. (Default value = None)
+        solids : dict
+            Cache of the part solids used to detect cavities, keyed by part label.
+            It is filled as needed and can be shared between cross sections.
+            (Default value = None)
+        Returns
+        -------
+        Geo2DData
+
+        """
+
+        if solids is None:
+            solids = {}
 
         # Get our new coordinates
         # This constructions tries to align the new coordinates to our old coordinates
@@ -196,7 +574,7 @@ class Geo3DData(GeoData):
         # [0,0,1] -> [1,0,0] [0,1,0]
 
         # Find out which axis the projection axis is most closely aligned to
-        x_new = np.array(self.xsecs[xsec_name]["axis"])
+        x_new = np.array(axis, dtype=float)
         ind = np.argmax(np.abs(x_new))
         y_new = np.array([0, 1.0, 0]) if ind == 0 else np.array([1.0, 0, 0])
         y_new -= y_new.dot(x_new) * x_new
@@ -216,7 +594,7 @@ class Geo3DData(GeoData):
             List of projection.
 
             """
-            vec = vec - x_new * self.xsecs[xsec_name]["distance"]
+            vec = vec - x_new * distance
             return [vec.dot(y_new), vec.dot(z_new)]
 
         def _inverse_project(vec):
@@ -230,11 +608,7 @@ class Geo3DData(GeoData):
             Float, inverse of _project.
 
             """
-            return (
-                x_new * self.xsecs[xsec_name]["distance"]
-                + vec[0] * y_new
-                + vec[1] * z_new
-            )
+            return x_new * distance + vec[0] * y_new + vec[1] * z_new
 
         part_polygons = {}
         virtual_part_polygons = {}
@@ -242,7 +616,7 @@ class Geo3DData(GeoData):
         # is the same for virtual parts
         for part_name in self.build_order:
             polygons = []
-            for name, points in self.xsecs[xsec_name]["polygons"].items():
+            for name, points in xsec_polygons.items():
                 if name.startswith(f"{part_name}_"):
                     poly = Polygon(map(_project, points))
                     # we add a name to the polygon so we can reference it easier later
@@ -269,19 +643,51 @@ class Geo3DData(GeoData):
 
             """
             poly_by_area = sorted(poly_list, key=lambda p: p.area)
+            rank = {id(poly): i for i, poly in enumerate(poly_by_area)}
+            tree = STRtree(poly_by_area)
 
             # graph["poly_name"] is a list of polygons that poly_name contains
             graph = {poly.name: [] for poly in poly_list}
 
             for i, poly in enumerate(poly_by_area):
                 # Find the smallest polygon that contains poly (if any), and add it to
-                # the graph
-                for bigger_poly in poly_by_area[i + 1 :]:
-                    if bigger_poly.contains(poly):
-                        graph[bigger_poly.name].append(poly)
+                # the graph. Only polygons whose bounding box intersects that of poly
+                # are candidates.
+                hits = tree.query(poly)
+                if len(hits) and isinstance(hits[0], (int, np.integer)):
+                    candidates = sorted(j for j in hits if j > i)  # shapely >= 2
+                else:
+                    candidates = sorted(
+                        rank[id(hit)] for hit in hits if rank[id(hit)] > i
+                    )
+                for j in candidates:
+                    if poly_by_area[j].contains(poly):
+                        graph[poly_by_area[j].name].append(poly)
                         break
             return graph
 
+        def _nesting_depths(poly_list, graph):
+            """Given a list of polygons and their containment graph, return the number
+            of polygons enclosing each polygon, keyed by polygon name.
+
+            Parameters
+            ----------
+            poly_list :
+            graph :
+            Returns
+            -------
+            depths
+
+            """
+            contained = {poly.name for polys in graph.values() for poly in polys}
+            stack = [(poly, 0) for poly in poly_list if poly.name not in contained]
+            depths = {}
+            while stack:
+                poly, depth = stack.pop()
+                depths[poly.name] = depth
+                stack.extend((inner, depth + 1) for inner in graph[poly.name])
+            return depths
+
         def _is_inside(poly, part):
             """Given a polygon, find a point inside of it, and then check if that point is
             in the (3D) part
@@ -309,24 +715,30 @@ class Geo3DData(GeoData):
 
             # Get 3D coordinates and check if it's in the freecad shape
             x, y, z = _inverse_project([x, y])
-            freecad_solid = Part.Solid(
-                FreeCAD.ActiveDocument.getObject(part.built_fc_name).Shape
-            )
-            return freecad_solid.isInside(Base.Vector(x, y, z), 1e-5, True)
+            if part.label not in solids:
+                solids[part.label] = Part.Solid(doc.getObject(part.built_fc_name).Shape)
+            return solids[part.label].isInside(Base.Vector(x, y, z), 1e-5, True)
 
         # Let's deal with the physical domains first, which can have cavities
         geo_2d = Geo2DData()
-        self.get_data("fcdoc")  # The document name is "instance"
         for name, poly_list in part_polygons.items():
             cont_graph = _build_containment_graph(poly_list)
+            if doc is None:
+                depths = _nesting_depths(poly_list, cont_graph)
             polys_to_add = []
             # For each polygon (in each part), we subtract from it all interior polygons
             # And then check if what remains is inside the part or not (it could be a
-            # cavity). We add it if it's not a cavity
+            # cavity). We add it if it's not a cavity. The section of a solid
+            # alternates between material and cavities with every nesting level, so
+            # without a document this is decided from the nesting depth.
             for poly in poly_list:
+                is_cavity = doc is None and depths[poly.name] % 2 == 1
                 for interior_poly in cont_graph[poly.name]:
                     poly = poly.difference(interior_poly)
-                if _is_inside(poly, self.parts[name]):
+                if doc is None:
+                    if not is_cavity:
+                        polys_to_add.append(poly)
+                elif _is_inside(poly, self.parts[name]):
                     polys_to_add.append(poly)
             if not polys_to_add:
                 continue
@@ -344,7 +756,5 @@ class Geo3DData(GeoData):
             for i, poly in enumerate(poly_list):
                 geo_2d.add_part(f"{name}:{i}", poly)
 
-        geo_2d.lunit = self.lunit if lunit is None else None
-        # Clean up freecad document
-        FreeCAD.closeDocument("instance")
+        geo_2d.lunit = self.lunit if lunit is None else lunit
         return geo_2d
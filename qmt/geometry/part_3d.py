@@ -6,7 +6,7 @@ special case because we need to inherit a base class with a default parameter (n
 virtual), and dataclasses don't play well with that inheritance
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from enum import Enum
 from qmt.infrastructure import write_deserialised
 
@@ -29,11 +29,53 @@ class Geo3DPart:
         """
         self.built_fc_name: Optional[str] = None  # This gets set on geometry build
         self.fc_name = fc_name
+        # Whether fc_name was looked up from the label. This gets set on geometry build
+        self.fc_name_from_label = False
         self.label = label
-        self.serial_stl: Optional[str] = None  # This gets set on geometry build
-        self.serial_stp: Optional[str] = None  # This gets set on geometry build
+        self.serial_stl: Optional[Union[str, bytes]] = None  # Set on geometry build
+        self.serial_stp: Optional[Union[str, bytes]] = None  # Set on geometry build
+        # Serialized FreeCAD document holding the built part, the compression of its
+        # exports and the STL export options, used to export the part on demand.
+        # Set on geometry build
+        self.export_source: Optional[
+            Tuple[Union[str, bytes], Optional[str], Optional[Dict]]
+        ] = None
         self.virtual = virtual
 
+    def get_serial(self, fmt: str) -> Union[str, bytes]:
+        """Return the serialized STEP or STL export of the part.
+
+        Exports that were not made during the geometry build are generated from the
+        built FreeCAD document on first access and kept on the part.
+
+        Parameters
+        ----------
+        fmt : str
+            "stp" or "stl".
+        Returns
+        -------
+        serial_data
+
+        """
+        if fmt not in ("stp", "stl"):
+            raise ValueError(f"Unknown export format {fmt}, use stp or stl.")
+        serial = getattr(self, "serial_" + fmt)
+        if serial is None and getattr(self, "export_source", None) is not None:
+            from qmt.geometry.freecad.fileIO import exportFromSerialDoc
+
+            serial_fcdoc, compression, stl_options = self.export_source
+            serial = exportFromSerialDoc(
+                serial_fcdoc,
+                {self.label: self.built_fc_name},
+                [fmt],
+                compression,
+                meshOptions=stl_options,
+            )[self.label][fmt]
+            setattr(self, "serial_" + fmt, serial)
+        if serial is None:
+            raise ValueError(f"Part {self.label} has no {fmt.upper()} export.")
+        return serial
+
     def write_stp(self, file_path=None):
         """Write part geometry to a STEP file.
 
@@ -50,7 +92,7 @@ class Geo3DPart:
         """
         if file_path is None:
             file_path = f"{self.label}.stp"
-        write_deserialised(self.serial_stp, file_path)
+        write_deserialised(self.get_serial("stp"), file_path)
         return file_path
 
     def write_stl(self, file_path=None):
@@ -69,7 +111,7 @@ class Geo3DPart:
         """
         if file_path is None:
             file_path = f"{self.label}.stl"
-        write_deserialised(self.serial_stl, file_path)
+        write_deserialised(self.get_serial("stl"), file_path)
         return file_path
 
 
@@ -0,0 +1,164 @@
+"""
+Part maps, i.e. callables that map spatial coordinates to part identifiers. These are
+used as the `part_map` argument of PropertyMap and MaterialPropertyMap.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, List
+import numpy as np
+from shapely.vectorized import contains, touches
+from .geo_2d_data import Geo2DData
+
+
+class _IndexedPartMap(ABC):
+    """Base class for part maps that label points by an index into `partNames`."""
+
+    partNames: List[str]
+    fillValue: Any
+
+    @abstractmethod
+    def part_indices(self, x) -> np.ndarray:
+        """Find the index into `partNames` of the part containing each point, or -1
+        for points outside of all parts.
+        """
+
+    def __call__(self, x):
+        """Find the part(s) containing one or more points.
+
+        Parameters
+        ----------
+        x :
+            Coordinate vector or array of coordinate vectors.
+
+        Returns
+        -------
+        Part name (or `fill_value`) for a single point, otherwise an object array of
+        shape x.shape[:-1].
+
+        """
+        labels = self.part_indices(x)
+        names = np.empty(len(self.partNames) + 1, dtype=object)
+        names[:-1] = self.partNames
+        names[-1] = self.fillValue
+        return names[labels]
+
+
+class Geo2DPartMap(_IndexedPartMap):
+    """Map 2D points to the names of the Geo2DData parts containing them.
+
+    Points are classified in one batched call: the points are sorted along x once,
+    and for each polygon only the points inside its bounding box are handed to
+    shapely's vectorized point-in-polygon test. Overlaps are resolved by the part
+    build order, i.e. the leftmost part in `Geo2DData.part_build_order()` wins.
+
+    Parameters
+    ----------
+    geo_2d : Geo2DData
+        Geometry whose polygon parts are mapped. Edges are ignored.
+    fill_value :
+        Identifier returned for points that are not inside any part.
+        (Default value = None)
+
+    """
+
+    def __init__(self, geo_2d: Geo2DData, fill_value: Any = None):
+        self.partNames: List[str] = geo_2d.part_build_order()
+        self.polygons = [geo_2d.parts[name] for name in self.partNames]
+        self.fillValue = fill_value
+
+    def part_indices(self, x) -> np.ndarray:
+        """Find the index into `partNames` of the part containing each point.
+
+        Parameters
+        ----------
+        x :
+            Array of shape (..., 2) of coordinate vectors.
+
+        Returns
+        -------
+        Integer array of shape x.shape[:-1]. Points outside of all parts get -1.
+
+        """
+        x = np.asarray(x, dtype=float)
+        if x.shape[-1] != 2:
+            raise ValueError(f"Expected 2D coordinates, got shape {x.shape}.")
+        points = x.reshape(-1, 2)
+        labels = np.full(len(points), -1, dtype=int)
+
+        order = np.argsort(points[:, 0], kind="stable")
+        sorted_x = points[order, 0]
+        for index, polygon in enumerate(self.polygons):
+            min_x, min_y, max_x, max_y = polygon.bounds
+            start = np.searchsorted(sorted_x, min_x, side="left")
+            stop = np.searchsorted(sorted_x, max_x, side="right")
+            candidates = order[start:stop]
+            # Parts earlier in the build order take priority
+            candidates = candidates[labels[candidates] < 0]
+            y = points[candidates, 1]
+            candidates = candidates[(y >= min_y) & (y <= max_y)]
+            if not len(candidates):
+                continue
+            px, py = points[candidates, 0], points[candidates, 1]
+            inside = contains(polygon, px, py) | touches(polygon, px, py)
+            labels[candidates[inside]] = index
+        return labels.reshape(x.shape[:-1])
+
+
+class Geo3DPartMap(_IndexedPartMap):
+    """Map 3D points to part names by nearest-cell lookup in a voxel label grid.
+
+    Instances are usually obtained from `Geo3DData.rasterize`.
+
+    Parameters
+    ----------
+    labels : np.ndarray
+        Integer array of shape (nx, ny, nz) holding, for each cell, the index into
+        `part_names` of the part occupying the cell center, or -1 for empty cells.
+    origin : Sequence[float]
+        Lower corner of the grid.
+    spacing : Sequence[float]
+        Cell extent along each axis.
+    part_names : List[str]
+        Names of the parts referenced by `labels`.
+    fill_value :
+        Identifier returned for points in empty cells or outside of the grid.
+        (Default value = None)
+
+    """
+
+    def __init__(self, labels, origin, spacing, part_names, fill_value: Any = None):
+        self.labels = np.asarray(labels)
+        if self.labels.ndim != 3:
+            raise ValueError(
+                f"Expected a 3D label grid, got shape {self.labels.shape}."
+            )
+        self.origin = np.asarray(origin, dtype=float)
+        self.spacing = np.broadcast_to(np.asarray(spacing, dtype=float), (3,))
+        self.partNames: List[str] = list(part_names)
+        self.fillValue = fill_value
+
+    def part_indices(self, x) -> np.ndarray:
+        """Find the index into `partNames` of the part containing each point.
+
+        Parameters
+        ----------
+        x :
+            Array of shape (..., 3) of coordinate vectors.
+
+        Returns
+        -------
+        Integer array of shape x.shape[:-1]. Points outside of all parts get -1.
+
+        """
+        x = np.asarray(x, dtype=float)
+        if x.shape[-1] != 3:
+            raise ValueError(f"Expected 3D coordinates, got shape {x.shape}.")
+        points = x.reshape(-1, 3)
+        grid_shape = np.array(self.labels.shape)
+        rel = (points - self.origin) / self.spacing
+        valid = np.all((rel >= 0) & (rel <= grid_shape), axis=1)
+        # Points on the upper faces of the grid belong to the last cell
+        cells = np.minimum(np.floor(rel[valid]).astype(int), grid_shape - 1)
+        labels = np.full(len(points), -1, dtype=int)
+        labels[valid] = self.labels[tuple(cells.T)]
+        return labels.reshape(x.shape[:-1])
@@ -5,10 +5,13 @@ from .data_utils import (
     load_serial,
     store_serial,
     write_deserialised,
+    deserialise,
     serialize_file,
+    get_scratch_dir,
     reduce_data,
     retrieve_data,
     stream_data_to_file,
+    read_data_from_file,
 )
 from .solvers_2d import Potential2dData, ThomasFermi2dData, Bdg2dData, Phase2dData
 from .solvers_3d import TransportData
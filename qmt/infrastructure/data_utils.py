@@ -3,30 +3,112 @@
 
 """Utility functions for dealing with data."""
 
+import io
 import os
 import uuid
 import codecs
+import atexit
+import shutil
+import threading
+import multiprocessing.util
 import h5py
-import time
+import numpy as np
 import dask
 import dask.delayed
 import tempfile
 
 
-def serialize_file(path):
+# Per-process scratch directory, see `get_scratch_dir`
+_process_scratch = {"pid": None, "path": None}
+_scratch_lock = threading.Lock()
+
+# Frame magic numbers used to recognise compressed binary blobs
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_LZ4_MAGIC = b"\x04\x22\x4d\x18"
+
+
+def _compress(data, compression):
+    """Compress raw bytes with the given codec.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Data to compress.
+    compression : str
+        None, "zstd" or "lz4".
+
+    Returns
+    -------
+    bytes
+
+    """
+    if compression is None:
+        return data
+    elif compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    elif compression == "lz4":
+        import lz4.frame
+
+        return lz4.frame.compress(data)
+    else:
+        raise ValueError(f"Unknown compression {compression}.")
+
+
+def deserialise(serial_obj):
+    """Return the raw file contents of a serialised blob.
+
+    Both the legacy base64 `str` format and the binary format (raw or zstd/lz4
+    compressed `bytes`) are accepted. Raw binary blobs are returned without copying.
+
+    Parameters
+    ----------
+    serial_obj : str or bytes-like
+        Blob returned by `serialize_file` or `store_serial`.
+
+    Returns
+    -------
+    bytes or memoryview
+
+    """
+    if isinstance(serial_obj, str):
+        return codecs.decode(serial_obj.encode(), "base64")
+    data = memoryview(serial_obj)
+    if data[:4] == _ZSTD_MAGIC:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif data[:4] == _LZ4_MAGIC:
+        import lz4.frame
+
+        return lz4.frame.decompress(data)
+    return data
+
+
+def serialize_file(path, binary=False, compression=None):
     """Return a serialised blob of the contents of a given file path.
 
     Parameters
     ----------
     path : str
         Filename.
+    binary : bool
+        If True, return the file contents as `bytes` instead of a base64 encoded
+        `str`. (Default value = False)
+    compression : str
+        Optional compression of binary blobs, "zstd" or "lz4". (Default value = None)
 
     Returns
     -------
     serial_data
 
     """
+    if compression is not None and not binary:
+        raise ValueError("Compression is only supported for binary serialisation.")
     with open(path, "rb") as f:
+        if binary:
+            return _compress(f.read(), compression)
         serial_data = codecs.encode(f.read(), "base64").decode()
     return serial_data
 
@@ -36,8 +118,8 @@ def write_deserialised(serial_obj, path):
 
     Parameters
     ----------
-    serial_obj :
-
+    serial_obj : str or bytes-like
+        Blob in base64 or binary format.
     path : str
         Filename.
 
@@ -46,12 +128,102 @@ def write_deserialised(serial_obj, path):
     None
 
     """
-    data = codecs.decode(serial_obj.encode(), "base64")
+    data = deserialise(serial_obj)
     with open(path, "wb") as f:
         f.write(data)
 
 
-def store_serial(obj, save_fct, ext_format, scratch_dir=None):
+def _remove_scratch_dir(path, pid):
+    """Remove the scratch directory of process `pid` at interpreter exit.
+
+    Forked children inherit the atexit handlers of their parent, so only the process
+    that created the directory removes it.
+    """
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def get_scratch_dir():
+    """Return the reusable scratch directory of the current process.
+
+    The directory is created on first use, preferably in memory-backed storage
+    (/dev/shm) and otherwise in the system temporary directory. It is private to the
+    current process, so forked workers get their own, and it is removed when the
+    process exits.
+
+    Returns
+    -------
+    path : str
+
+    """
+    pid = os.getpid()
+    with _scratch_lock:
+        if _process_scratch["pid"] != pid or not os.path.isdir(
+            _process_scratch["path"]
+        ):
+            base_dir = None
+            if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+                base_dir = "/dev/shm"
+            path = tempfile.mkdtemp(prefix=f"qmt_{pid}_", dir=base_dir)
+            atexit.register(_remove_scratch_dir, path, pid)
+            # multiprocessing workers leave through os._exit and skip atexit
+            multiprocessing.util.Finalize(
+                None, _remove_scratch_dir, args=(path, pid), exitpriority=0
+            )
+            _process_scratch["pid"] = pid
+            _process_scratch["path"] = path
+        return _process_scratch["path"]
+
+
+def _scratch_path(scratch_dir, ext_format):
+    """Return a file path to stage data in.
+
+    Without an explicit `scratch_dir`, the path is a fixed name per thread and file
+    extension inside the per-process scratch directory, so that repeated calls reuse
+    the same file. Explicitly given directories may be shared between processes and
+    get a unique file name instead.
+
+    Parameters
+    ----------
+    scratch_dir : str
+        Optional user-specified directory.
+    ext_format : str
+        File extension.
+
+    Returns
+    -------
+    tmp_path, reusable
+
+    """
+    if scratch_dir:
+        return os.path.join(scratch_dir, uuid.uuid4().hex + "." + ext_format), False
+    name = f"{threading.get_ident()}.{ext_format}"
+    return os.path.join(get_scratch_dir(), name), True
+
+
+def _release_scratch_path(tmp_path, reusable):
+    """Free a path obtained from `_scratch_path`.
+
+    Reusable files are truncated rather than removed, which releases their memory but
+    keeps the directory entry around for the next call.
+    """
+    if not os.path.exists(tmp_path):
+        return
+    if reusable:
+        os.truncate(tmp_path, 0)
+    else:
+        os.remove(tmp_path)
+
+
+def store_serial(
+    obj,
+    save_fct,
+    ext_format,
+    scratch_dir=None,
+    binary=False,
+    compression=None,
+    in_memory=False,
+):
     """Return a serialised representation of
     `save_fct(obj, scratch_dir/temporary_file.ext_format)`.
     The parameter `ext_format` can be used for format distinction in some `save_fct`.
@@ -65,50 +237,75 @@ def store_serial(obj, save_fct, ext_format, scratch_dir=None):
     ext_format :
 
     scratch_dir : str
-        (Default value = None)
+        Directory for the temporary file. If None, a reusable file in the per-process
+        scratch directory is used, see `get_scratch_dir`. (Default value = None)
+    binary : bool
+        Return `bytes` instead of a base64 encoded `str`. (Default value = False)
+    compression : str
+        Optional compression of binary blobs, "zstd" or "lz4". (Default value = None)
+    in_memory : bool
+        If True, `save_fct` is passed a binary file object instead of a path and no
+        temporary file is written. Only use this with save functions that accept
+        file objects. (Default value = False)
 
     Returns
     -------
     serial_data
 
     """
-    if not scratch_dir:
-        scratch_dir = tempfile.gettempdir()
-    tmp_path = os.path.join(scratch_dir, uuid.uuid4().hex + "." + ext_format)
-    save_fct(obj, tmp_path)
-    serial_data = serialize_file(tmp_path)
-    os.remove(tmp_path)
+    if compression is not None and not binary:
+        raise ValueError("Compression is only supported for binary serialisation.")
+    if in_memory:
+        buffer = io.BytesIO()
+        save_fct(obj, buffer)
+        if binary:
+            return _compress(buffer.getvalue(), compression)
+        return codecs.encode(buffer.getbuffer(), "base64").decode()
+    tmp_path, reusable = _scratch_path(scratch_dir, ext_format)
+    try:
+        save_fct(obj, tmp_path)
+        serial_data = serialize_file(tmp_path, binary=binary, compression=compression)
+    finally:
+        _release_scratch_path(tmp_path, reusable)
     return serial_data
 
 
-def load_serial(serial_obj, load_fct, ext_format=None, scratch_dir=None):
+def load_serial(
+    serial_obj, load_fct, ext_format=None, scratch_dir=None, in_memory=False
+):
     """Return the original object stored with `store_serial`. The `load_fct`
     must be a correct complement of the previously used `store_fct`.
 
     Parameters
     ----------
-    serial_obj :
-
+    serial_obj : str or bytes-like
+        Blob in base64 or binary format.
     load_fct :
 
     ext_format :
         (Default value = None)
     scratch_dir : str
-        (Default value = None)
+        Directory for the temporary file. If None, a reusable file in the per-process
+        scratch directory is used, see `get_scratch_dir`. (Default value = None)
+    in_memory : bool
+        If True, `load_fct` is passed a binary file object instead of a path and no
+        temporary file is written. (Default value = False)
 
     Returns
     -------
     obj
 
     """
+    if in_memory:
+        return load_fct(io.BytesIO(deserialise(serial_obj)))
     if not ext_format:
         ext_format = "tmpdata"
-    if not scratch_dir:
-        scratch_dir = tempfile.gettempdir()
-    tmp_path = os.path.join(scratch_dir, uuid.uuid4().hex + "." + ext_format)
-    write_deserialised(serial_obj, tmp_path)
-    obj = load_fct(tmp_path)
-    os.remove(tmp_path)
+    tmp_path, reusable = _scratch_path(scratch_dir, ext_format)
+    try:
+        write_deserialised(serial_obj, tmp_path)
+        obj = load_fct(tmp_path)
+    finally:
+        _release_scratch_path(tmp_path, reusable)
     return obj
 
 
@@ -166,12 +363,114 @@ def retrieve_data(extracted_data, dask_client):
     return retrieved_data
 
 
-def stream_data_to_file(extracted_data, filename, dask_client, sweep_vals=None):
+def _write_stream_entry(
+    group, index, name, value, num_entries, chunked, compression=None
+):
+    """Write a single datum of a streamed sweep to an open hdf5 file.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Open output file, or its "results" group for the chunked layout.
+    index : int
+        Sweep index of the datum.
+    name : str
+        Key of the datum.
+    value :
+        Datum to store.
+    num_entries : int
+        Total number of sweep points.
+    chunked : bool
+        Whether to use the one-dataset-per-key layout.
+    compression : str
+        hdf5 compression filter of new chunked datasets. (Default value = None)
+
+    Returns
+    -------
+    None
+
+    """
+    if not chunked:
+        group.create_dataset(str(index) + "_" + name, data=value)
+        return
+    value = np.asarray(value)
+    if name not in group:
+        fill_value = np.nan if value.dtype.kind in "fc" else None
+        group.create_dataset(
+            name,
+            shape=(num_entries,) + value.shape,
+            maxshape=(None,) + value.shape,
+            chunks=True,
+            dtype=value.dtype,
+            fillvalue=fill_value,
+            compression=compression,
+        )
+    dataset = group[name]
+    if dataset.shape[1:] != value.shape:
+        raise ValueError(
+            f"Shape {value.shape} of '{name}' at index {index} does not match the "
+            f"shape {dataset.shape[1:]} of previous results. Use chunked=False "
+            "for results of varying shape."
+        )
+    if index >= dataset.shape[0]:
+        dataset.resize(index + 1, axis=0)
+    dataset[index] = value
+
+
+def _write_sweep_table(group, sweep_vals):
+    """Write the sweep values as a table with one column dataset per parameter.
+
+    Parameters
+    ----------
+    group : h5py.Group
+        Group to hold the columns.
+    sweep_vals : list
+        List of dicts with the same keys.
+
+    Returns
+    -------
+    None
+
+    """
+    params = list(sweep_vals[0].keys()) if sweep_vals else []
+    for index, point in enumerate(sweep_vals):
+        if list(point.keys()) != params:
+            raise ValueError(
+                f"Sweep point {index} has parameters {list(point.keys())}, expected "
+                f"{params}. The chunked layout needs the same parameters for all "
+                "sweep points."
+            )
+    columns = [str(k) for k in params]
+    for column, k in zip(columns, params):
+        values = np.asarray([point[k] for point in sweep_vals])
+        if values.dtype.kind == "U":
+            values = values.astype(h5py.string_dtype())
+        group.create_dataset(column, data=values)
+    group.attrs["columns"] = columns
+
+
+def stream_data_to_file(
+    extracted_data,
+    filename,
+    dask_client,
+    sweep_vals=None,
+    chunked=False,
+    compression=None,
+):
     """Instead of simply retrieving all the data, we can stream it to a file on disk as the runs
     complete. The data are stored in an hdf5 file with a single level. Data entries are given by
     kesy of the form "index_paramval", where index is the numerical index of the result in the
     extracted_data list and paramval is the descriptive key for the datum of interest.
 
+    With `chunked=True`, the file uses a columnar layout instead: each key gets a single
+    chunked (optionally compressed) dataset named after the key in the "results" group,
+    whose leading axis is the sweep index. Its first dimension is resizable, so further rows can be appended later.
+    The sweep values are written up front as a table to the "sweep" group, with one column
+    dataset per parameter, and the boolean "completed" dataset records which rows have been
+    written. Use `read_data_from_file` to load either layout.
+
+    Results are written in batches as they arrive.
+
     Parameters
     ----------
     extracted_data : list
@@ -181,33 +480,169 @@ def stream_data_to_file(extracted_data, filename, dask_client, sweep_vals=None):
     dask_client :
         The client we are using for the calculation
     sweep_vals :
-        Sweep point values to store along with the data. If None, then just uses
-        an integer list. (Default value = None)
+        List of dicts with the sweep point values to store along with the data. If None,
+        no sweep values are stored. (Default value = None)
+    chunked : bool
+        Whether to store one chunked dataset per key instead of one dataset per key
+        and index. (Default value = False)
+    compression : str
+        hdf5 compression filter for the result datasets of the chunked layout, e.g.
+        "gzip" or "lzf". (Default value = None)
 
     Returns
     -------
     None
 
     """
+    from distributed import as_completed
     from tqdm import tqdm
 
-    if sweep_vals is None:
-        sweep_vals = range(len(extracted_data))
+    if compression is not None and not chunked:
+        raise ValueError("Compression is only supported for the chunked layout.")
+    num_entries = len(extracted_data)
+    indices = {}
+    for index, future in enumerate(extracted_data):
+        indices.setdefault(future.key, []).append(index)
     with h5py.File(filename, "w") as data_file:
-        # loop through data, write data as it comes in
-        job_finished = [False] * len(extracted_data)
-        pbar = tqdm(total=len(extracted_data))
-        while not all(job_finished):
-            time.sleep(1.0)
-            for index, future in enumerate(extracted_data):
-                if future.status == "finished" and not job_finished[index]:
-                    for k in future.result().keys():
-                        data_file.create_dataset(
-                            str(index) + "_" + k, data=future.result()[k]
-                        )
-                    for k in sweep_vals[index].keys():
-                        data_file.create_dataset(
-                            str(index) + "_" + str(k), data=sweep_vals[index][k]
+        data_file.attrs["layout"] = "chunked" if chunked else "flat"
+        if sweep_vals is not None:
+            sweep_keys = sorted({str(k) for point in sweep_vals for k in point.keys()})
+            data_file.attrs["sweep_keys"] = sweep_keys
+        results = data_file
+        if chunked:
+            completed = data_file.create_dataset(
+                "completed", shape=(num_entries,), maxshape=(None,), dtype=bool
+            )
+            _write_sweep_table(data_file.create_group("sweep"), sweep_vals or [])
+            results = data_file.create_group("results")
+        pbar = tqdm(total=num_entries)
+        # Write each batch of results that finished in the meantime in one go
+        futures = as_completed(extracted_data, with_results=True)
+        for batch in futures.batches():
+            done = []
+            for future, result in batch:
+                for index in indices.pop(future.key, []):
+                    for k, value in result.items():
+                        _write_stream_entry(
+                            results,
+                            index,
+                            k,
+                            value,
+                            num_entries,
+                            chunked,
+                            compression=compression,
                         )
-                    job_finished[index] = True
-                    pbar.update(1)
+                    if sweep_vals is not None and not chunked:
+                        for k, value in sweep_vals[index].items():
+                            data_file.create_dataset(
+                                str(index) + "_" + str(k), data=value
+                            )
+                    done.append(index)
+            if chunked:
+                completed[sorted(done)] = True
+            data_file.flush()
+            pbar.update(len(done))
+        pbar.close()
+
+
+def _open_dataset(dataset, mmap):
+    """Return the contents of an hdf5 dataset, either loaded or without reading it.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+
+    mmap : bool
+        If True, contiguous uncompressed datasets are returned as read-only
+        `np.memmap` and all others as the (lazily sliceable) dataset itself.
+
+    Returns
+    -------
+    np.ndarray, np.memmap or h5py.Dataset
+
+    """
+    if not mmap:
+        if h5py.check_string_dtype(dataset.dtype) is not None:
+            return dataset.asstr()[()]
+        return dataset[()]
+    offset = dataset.id.get_offset()
+    if offset is None or dataset.chunks is not None or dataset.dtype.hasobject:
+        return dataset
+    return np.memmap(
+        dataset.file.filename,
+        mode="r",
+        dtype=dataset.dtype,
+        offset=offset,
+        shape=dataset.shape,
+    )
+
+
+def read_data_from_file(filename, keys=None, mmap=False):
+    """Read sweep results written by `stream_data_to_file` into per-key arrays.
+
+    Both layouts are supported. In the flat layout, the "index_key" datasets are
+    stacked along a leading sweep axis; entries of varying shape are returned as
+    lists instead.
+
+    Parameters
+    ----------
+    filename :
+        File name of the local data store.
+    keys : list
+        Result keys to read. If None, all keys are read. (Default value = None)
+    mmap : bool
+        If True, datasets of the chunked layout are not read into memory. They
+        are returned as read-only memory maps where the storage allows this and
+        as h5py datasets otherwise. Slices of those only read the requested
+        rows. The file stays open as long as such a dataset is referenced.
+        (Default value = False)
+
+    Returns
+    -------
+    sweep_vals, data, completed
+        Dicts mapping sweep parameter and result names to arrays whose first axis is
+        the sweep index, and a boolean array of the sweep points that have results.
+
+    """
+    data_file = h5py.File(filename, "r")
+    chunked = data_file.attrs.get("layout") == "chunked"
+    try:
+        sweep_keys = set(data_file.attrs.get("sweep_keys", []))
+        if chunked:
+            sweep_vals = {
+                k: _open_dataset(data_file["sweep"][k], mmap)
+                for k in data_file["sweep"].attrs["columns"]
+            }
+            results = data_file["results"]
+            data = {
+                k: _open_dataset(results[k], mmap)
+                for k in results.keys()
+                if keys is None or k in keys
+            }
+            return sweep_vals, data, data_file["completed"][()]
+
+        entries = {}
+        num_entries = 0
+        for name in data_file.keys():
+            index, k = name.split("_", 1)
+            if keys is not None and k not in keys and k not in sweep_keys:
+                continue
+            entries.setdefault(k, {})[int(index)] = _open_dataset(
+                data_file[name], False
+            )
+            num_entries = max(num_entries, int(index) + 1)
+        completed = np.zeros(num_entries, dtype=bool)
+        sweep_vals, data = {}, {}
+        for k, values in entries.items():
+            if k not in sweep_keys:
+                completed[list(values.keys())] = True
+            column = [values.get(index) for index in range(num_entries)]
+            try:
+                column = np.stack(column)
+            except (ValueError, TypeError):
+                pass
+            (sweep_vals if k in sweep_keys else data)[k] = column
+        return sweep_vals, data, completed
+    finally:
+        if not (mmap and chunked):
+            data_file.close()
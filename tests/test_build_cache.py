@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Testing the geometry build cache."""
+
+import os
+import time
+import numpy as np
+from qmt.geometry import part_3d, build_3d_geometry, BuildCache, build_cache_key
+from qmt.geometry import Geo3DData
+from qmt.infrastructure import serialize_file
+
+
+def _parts():
+    wire = part_3d.WirePart("Nanowire", "Sketch003", z0=0, thickness=0.5)
+    shell = part_3d.WireShellPart(
+        "Wire cover",
+        "Sketch004",
+        depo_mode="depo",
+        target_wire=wire,
+        thickness=0.2,
+        shell_verts=[1, 2],
+    )
+    return [wire, shell]
+
+
+def test_cache_key(datadir):
+    """Test that cache keys only depend on the build inputs."""
+    input_file = os.path.join(datadir, "geometry_test.fcstd")
+    serial_b64 = serialize_file(input_file)
+    serial_bin = serialize_file(input_file, binary=True)
+
+    key = build_cache_key(serial_b64, _parts(), {"d1": 2.0, "d2": 1})
+    assert key == build_cache_key(serial_bin, _parts(), {"d2": 1, "d1": np.float64(2)})
+    assert key != build_cache_key(serial_bin, _parts(), {"d2": 1, "d1": 2.5})
+    assert key != build_cache_key(serial_bin, _parts()[:1], {"d2": 1, "d1": 2.0})
+
+    # Build outputs don't change the key
+    parts = _parts()
+    parts[0].serial_stl = b"solid"
+    assert key == build_cache_key(serial_bin, parts, {"d1": 2.0, "d2": 1})
+
+    # Neither do FreeCAD names that the build looked up from the label
+    parts = _parts()
+    parts[0].fc_name = None
+    key = build_cache_key(serial_bin, parts, {"d1": 2.0, "d2": 1})
+    parts[0].fc_name = "Sketch003"
+    parts[0].fc_name_from_label = True
+    assert key == build_cache_key(serial_bin, parts, {"d1": 2.0, "d2": 1})
+
+
+def test_cache_lru(tmp_path):
+    """Test storage and least recently used eviction."""
+    cache = BuildCache(str(tmp_path))
+    for i in range(3):
+        geo = Geo3DData("um")
+        geo.serial_fcdoc = bytes(1000)
+        cache.put(f"key{i}", geo)
+        time.sleep(0.01)
+    assert len(cache) == 3
+    assert cache.get("missing") is None
+    assert cache.get("key0").lunit == "um"  # refreshes key0
+
+    entry_size = os.path.getsize(os.path.join(str(tmp_path), "key0.geo3d"))
+    cache.max_size = 2 * entry_size
+    cache.evict()
+    assert "key0" in cache and "key2" in cache and "key1" not in cache
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cached_build(datadir, tmp_path):
+    """Test that cached builds are reused."""
+    input_file = os.path.join(datadir, "geometry_test.fcstd")
+    block = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    cache = BuildCache(str(tmp_path))
+    geo = build_3d_geometry(
+        [block], input_file=input_file, params={"d1": 2.0}, cache=cache
+    )
+    assert len(cache) == 1
+    cached = build_3d_geometry(
+        [block], input_file=input_file, params={"d1": 2.0}, cache=str(tmp_path)
+    )
+    assert list(cached.parts.keys()) == list(geo.parts.keys())
+    assert bytes(cached.parts[block.label].serial_stl) == bytes(
+        geo.parts[block.label].serial_stl
+    )
+    build_3d_geometry([block], input_file=input_file, params={"d1": 3.0}, cache=cache)
+    assert len(cache) == 2
@@ -3,9 +3,21 @@
 
 """Testing data utilities."""
 
-from qmt.infrastructure import store_serial
+from qmt.infrastructure import (
+    store_serial,
+    load_serial,
+    serialize_file,
+    write_deserialised,
+    deserialise,
+    get_scratch_dir,
+    stream_data_to_file,
+    read_data_from_file,
+)
 import codecs
 import os
+import pickle
+import numpy as np
+import pytest
 
 
 def test_store_serial(datadir, fix_FCDoc):
@@ -30,3 +42,160 @@ def test_store_serial(datadir, fix_FCDoc):
 
     assert doc.getObject("some_content") is not None
     FreeCAD.closeDocument("instance")
+
+
+def test_binary_serialisation(datadir):
+    """Test the binary format and backward compatibility with base64 blobs."""
+    file_path = os.path.join(datadir, "blob.stl")
+    content = b"solid test\n" * 100
+    with open(file_path, "wb") as f:
+        f.write(content)
+
+    serial_b64 = serialize_file(file_path)
+    serial_bin = serialize_file(file_path, binary=True)
+    assert isinstance(serial_b64, str)
+    assert isinstance(serial_bin, bytes)
+    assert serial_bin == content
+    assert bytes(deserialise(serial_b64)) == content
+    assert bytes(deserialise(serial_bin)) == content
+
+    out_path = os.path.join(datadir, "out.stl")
+    write_deserialised(serial_bin, out_path)
+    with open(out_path, "rb") as f:
+        assert f.read() == content
+
+    with pytest.raises(ValueError):
+        serialize_file(file_path, compression="zstd")
+
+    def _save(obj, path):
+        with open(path, "wb") as f:
+            f.write(obj)
+
+    def _load(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    serial_data = store_serial(content, _save, "stl", binary=True)
+    assert load_serial(serial_data, _load) == content
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4"])
+def test_compressed_serialisation(datadir, compression):
+    """Test compressed binary blobs."""
+    pytest.importorskip({"zstd": "zstandard", "lz4": "lz4"}[compression])
+    file_path = os.path.join(datadir, "blob.stl")
+    content = b"solid test\n" * 100
+    with open(file_path, "wb") as f:
+        f.write(content)
+
+    serial_data = serialize_file(file_path, binary=True, compression=compression)
+    assert len(serial_data) < len(content)
+    assert bytes(deserialise(serial_data)) == content
+
+
+def test_scratch_reuse(datadir):
+    """Test that staging files are reused and that in-memory serialisation works."""
+
+    def _save(obj, path):
+        with open(path, "wb") as f:
+            pickle.dump(obj, f)
+
+    def _load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    scratch_dir = get_scratch_dir()
+    assert os.path.isdir(scratch_dir)
+    assert get_scratch_dir() == scratch_dir
+
+    for i in range(3):
+        serial_data = store_serial({"i": i}, _save, "pkl", binary=True)
+        assert load_serial(serial_data, _load, "pkl") == {"i": i}
+    staged = [f for f in os.listdir(scratch_dir) if f.endswith(".pkl")]
+    assert len(staged) == 1
+    assert os.path.getsize(os.path.join(scratch_dir, staged[0])) == 0
+
+    # Explicit scratch directories get unique names that are cleaned up
+    serial_data = store_serial({"i": 0}, _save, "pkl", scratch_dir=str(datadir))
+    assert load_serial(serial_data, _load, "pkl", scratch_dir=str(datadir)) == {"i": 0}
+    assert not [f for f in os.listdir(datadir) if f.endswith(".pkl")]
+
+    serial_data = store_serial({"i": 4}, pickle.dump, "pkl", in_memory=True)
+    assert isinstance(serial_data, str)
+    assert load_serial(serial_data, pickle.load, in_memory=True) == {"i": 4}
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_stream_data_to_file(datadir, chunked):
+    """Test streaming of results to hdf5 in both layouts."""
+    import h5py
+    from dask import delayed
+    from dask.distributed import Client
+
+    def _run(i):
+        return {"energies": np.arange(3.0) * i, "charge": i}
+
+    dc = Client(processes=False)
+    try:
+        futures = [dc.compute(delayed(_run)(i)) for i in range(10)]
+        sweep_vals = [{"gate": 0.5 * i} for i in range(10)]
+        file_path = os.path.join(datadir, "sweep.h5")
+        stream_data_to_file(
+            futures,
+            file_path,
+            dc,
+            sweep_vals,
+            chunked=chunked,
+            compression="gzip" if chunked else None,
+        )
+    finally:
+        dc.close()
+
+    with h5py.File(file_path, "r") as data_file:
+        if chunked:
+            assert data_file["results/energies"].shape == (10, 3)
+            assert np.all(data_file["completed"][:])
+            assert np.allclose(data_file["results/energies"][4], [0.0, 4.0, 8.0])
+            assert np.array_equal(data_file["results/charge"][:], np.arange(10))
+            assert np.isclose(data_file["sweep/gate"][3], 1.5)
+        else:
+            assert len(data_file) == 30
+            assert np.allclose(data_file["4_energies"][:], [0.0, 4.0, 8.0])
+            assert data_file["7_charge"][()] == 7
+            assert np.isclose(data_file["3_gate"][()], 1.5)
+
+    sweep, data, completed = read_data_from_file(file_path)
+    assert np.all(completed)
+    assert set(data.keys()) == {"energies", "charge"}
+    assert data["energies"].shape == (10, 3)
+    assert np.allclose(data["energies"][:, 1], np.arange(10.0))
+    assert np.allclose(sweep["gate"], 0.5 * np.arange(10))
+
+    sweep, data, completed = read_data_from_file(file_path, keys=["charge"], mmap=True)
+    assert list(data.keys()) == ["charge"]
+    assert data["charge"][7] == 7
+
+
+def test_stream_data_reserved_names(datadir):
+    """Test that result keys don't collide with the bookkeeping of the chunked layout."""
+    from dask import delayed
+    from dask.distributed import Client
+
+    def _run(i):
+        return {"sweep": i, "completed": 2 * i}
+
+    dc = Client(processes=False)
+    try:
+        futures = [dc.compute(delayed(_run)(i)) for i in range(4)]
+        file_path = os.path.join(datadir, "reserved.h5")
+        stream_data_to_file(
+            futures, file_path, dc, [{"gate": i} for i in range(4)], chunked=True
+        )
+    finally:
+        dc.close()
+
+    sweep, data, completed = read_data_from_file(file_path)
+    assert np.all(completed)
+    assert np.array_equal(sweep["gate"], np.arange(4))
+    assert np.array_equal(data["sweep"], np.arange(4))
+    assert np.array_equal(data["completed"], 2 * np.arange(4))
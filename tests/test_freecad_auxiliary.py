@@ -3,6 +3,7 @@
 
 """Testing FreeCAD helper functions."""
 
+import multiprocessing
 import pytest
 from qmt.geometry.freecad.auxiliary import *
 from qmt.geometry.freecad.geomUtils import extrude
@@ -18,6 +19,45 @@ def test_delete(fix_FCDoc, fix_two_cycle_sketch):
     assert not fix_FCDoc.Objects
 
 
+def test_batch_delete(fix_FCDoc, fix_two_cycle_sketch):
+    """Test batched deletion with suspended recomputes."""
+    sketch = fix_two_cycle_sketch()
+    part1 = extrude(sketch, 10)
+    part2 = extrude(sketch, 5)
+    delete(part2)
+    batch_delete([part1, part2, sketch, part1])  # part2 is already deleted
+    assert not fix_FCDoc.Objects
+
+    # Stale objects don't delete live objects that reuse their name
+    sketch = fix_two_cycle_sketch()
+    stale = extrude(sketch, 10)
+    name = stale.Name
+    delete(stale)
+    part = extrude(sketch, 5, name=name)
+    batch_delete([stale])
+    assert part in fix_FCDoc.Objects
+    batch_delete([part, sketch])
+    assert not fix_FCDoc.Objects
+
+    sketch = fix_two_cycle_sketch()
+    part1 = extrude(sketch, 10)
+    fix_FCDoc.recompute()
+    with suspended_recompute():
+        with suspended_recompute():
+            delete(part1)
+        assert fix_FCDoc.Objects == [sketch]
+        batch_delete([sketch])
+    assert not fix_FCDoc.Objects
+    assert not fix_FCDoc.mustExecute()
+
+
+def test_forkedWorkersAvailable():
+    """Test that daemonic workers don't start worker processes of their own."""
+    assert forkedWorkersAvailable()
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        assert not pool.apply(forkedWorkersAvailable)
+
+
 def test_deepRemove(fix_FCDoc, fix_two_cycle_sketch):
     """Test deep (recursive) removal by all parameters."""
 
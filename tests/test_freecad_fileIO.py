@@ -27,6 +27,42 @@ def test_exportMeshed(datadir, fix_FCDoc):
     assert testBB == (xMin, xMax, yMin, yMax, zMin, zMax)
 
 
+def test_exportMeshed_options(datadir, fix_FCDoc):
+    """Test mesh export with explicit tessellation settings."""
+    cylinder = fix_FCDoc.addObject("Part::Cylinder", "cylinder")
+    cylinder.Radius = 5.0
+    cylinder.Height = 2.0
+    fix_FCDoc.recompute()
+
+    def _export(name, **kwargs):
+        filePath = os.path.join(datadir, name)
+        exportMeshed([cylinder], filePath, **kwargs)
+        with open(filePath, "rb") as f:
+            header = f.read(5)
+        return Mesh.Mesh(filePath), header
+
+    coarse, _ = _export("coarse.stl", linear_deflection=0.5)
+    fine, header = _export("fine.stl", linear_deflection=0.01, binary=True)
+    assert coarse.CountFacets < fine.CountFacets
+    assert header != b"solid"
+    decimated, header = _export(
+        "decimated.stl", linear_deflection=0.01, target_triangles=100, binary=False
+    )
+    assert decimated.CountFacets <= 110
+    assert header == b"solid"
+    assert decimated.BoundBox.XLength == pytest.approx(10.0, rel=0.05)
+
+    # only the format changes without tessellation options
+    default, header = _export("default.stl")
+    assert header != b"solid"
+    ascii_default, header = _export("ascii_default.stl", binary=False)
+    assert header == b"solid"
+    assert ascii_default.CountFacets == default.CountFacets
+
+    with pytest.raises(ValueError):
+        tessellate([cylinder], linear_deflection=0.0)
+
+
 def test_exportCAD(datadir, fix_FCDoc):
     """Test step export/import."""
     filePath = os.path.join(datadir, "tmp_testExport.stp")
@@ -3,6 +3,7 @@
 
 """Testing QMT geometry util functions."""
 
+import pytest
 from qmt.geometry.freecad.geomUtils import *
 
 vec = FreeCAD.Vector
@@ -128,6 +129,89 @@ def test_checkOverlap(fix_FCDoc):
     assert checkOverlap((box1, box2)) is False
 
 
+def test_shapesDisjoint(fix_FCDoc):
+    """Test the overlap screening and its cache."""
+    box1 = fix_FCDoc.addObject("Part::Box", "Box1")
+    box2 = fix_FCDoc.addObject("Part::Box", "Box2")
+    box3 = fix_FCDoc.addObject("Part::Box", "Box3")
+    box2.Placement = FreeCAD.Placement(
+        vec(10.1, 10.1, 0), FreeCAD.Rotation(vec(0, 0, 1), 0)
+    )
+    box3.Placement = FreeCAD.Placement(vec(2, 2, 2), FreeCAD.Rotation(vec(0, 0, 1), 0))
+    box3.Length = box3.Width = box3.Height = 1
+    fix_FCDoc.recompute()
+    assert shapesDisjoint(box1.Shape, box2.Shape) is True
+    # nested shapes have distant boundaries
+    assert shapesDisjoint(box1.Shape, box3.Shape) is False
+    assert shapesDisjoint(box3.Shape, box1.Shape) is False
+    # a compound with one solid far away and one nested solid
+    compound = Part.Compound([box2.Shape, box3.Shape])
+    assert shapesDisjoint(box1.Shape, compound) is False
+    assert shapesDisjoint(compound, box1.Shape) is False
+    cache = {}
+    assert checkOverlap([box1, box3], cache=cache) is True
+    assert checkOverlap([box1, box2], cache=cache) is False
+    assert checkOverlap([box2, box1], cache=cache) is False
+    assert len(cache) == 2
+    # moving a box changes its shape, so the cached result is not reused
+    box2.Placement = FreeCAD.Placement(vec(5, 5, 0), FreeCAD.Rotation(vec(0, 0, 1), 0))
+    fix_FCDoc.recompute()
+    assert checkOverlap([box1, box2], cache=cache) is True
+    assert len(cache) == 3
+    # a new object reusing a deleted object's name is not mistaken for it
+    fix_FCDoc.removeObject("Box3")
+    box4 = fix_FCDoc.addObject("Part::Box", "Box3")
+    box4.Placement = FreeCAD.Placement(
+        vec(20, 20, 0), FreeCAD.Rotation(vec(0, 0, 1), 0)
+    )
+    fix_FCDoc.recompute()
+    assert box4.Name == "Box3"
+    assert checkOverlap([box1, box4], cache=cache) is False
+
+
+def test_booleanEngine(fix_FCDoc):
+    """Test that the shape engine matches the document engine."""
+    box1 = fix_FCDoc.addObject("Part::Box", "Box1")
+    box2 = fix_FCDoc.addObject("Part::Box", "Box2")
+    box2.Placement = FreeCAD.Placement(vec(7, 0, 0), FreeCAD.Rotation(vec(0, 0, 1), 0))
+    fix_FCDoc.recompute()
+    results = {}
+    for engine in ["document", "shape"]:
+        with booleanEngine(engine):
+            results[engine] = (
+                genUnion([box1, box2]).Shape.Volume,
+                subtract(box1, box2).Shape.Volume,
+                intersect([box1, box2]).Shape.Volume,
+                checkOverlap([box1, box2]),
+            )
+    assert np.allclose(results["shape"][:3], results["document"][:3])
+    assert np.isclose(results["shape"][0], 10 ** 3 * 1.7)
+    assert results["shape"][3] is True
+
+    with booleanEngine("shape"):
+        num_objects = len(fix_FCDoc.Objects)
+        cut = subtract(box1, box2, consumeInputs=True)
+        assert len(fix_FCDoc.Objects) == num_objects - 1
+        assert np.isclose(cut.Shape.Volume, 10 ** 3 * 0.7)
+    with pytest.raises(ValueError):
+        with booleanEngine("kernel"):
+            pass
+
+
+def test_overlappingPairs(fix_FCDoc):
+    """Test the bounding box prefilter for overlap checks."""
+    boxes = []
+    for i, offset in enumerate([(0, 0, 0), (9.9, 0, 0), (30, 0, 0), (5, 5, 20)]):
+        box = fix_FCDoc.addObject("Part::Box", f"Box{i}")
+        box.Placement = FreeCAD.Placement(
+            vec(*offset), FreeCAD.Rotation(vec(0, 0, 1), 0)
+        )
+        boxes.append(box)
+    fix_FCDoc.recompute()
+    assert overlappingPairs(boxes) == {(0, 1)}
+    assert overlappingPairs([]) == set()
+
+
 def test_extrudeBetween(fix_FCDoc, fix_hexagon_sketch):
     """Test if extrusion bounding box is within z interval."""
     sketch = fix_hexagon_sketch()
@@ -154,6 +238,19 @@ def test_draftOffset(fix_FCDoc):
     assert draft.Height.Value + 40 == draft2.Height.Value
 
 
+def test_offsetSketch(fix_FCDoc, fix_rectangle_sketch):
+    """Check signed and batched offsets of a closed sketch."""
+    sketch = fix_rectangle_sketch(1, 2)
+    big, same, small = offsetSketch(sketch, [0.5, 0, -0.25])
+    assert np.allclose(getBB(big), (-0.5, 1.5, -0.5, 2.5, 0, 0))
+    assert np.allclose(getBB(same), getBB(sketch))
+    assert np.allclose(getBB(small), (0.25, 0.75, 0.25, 1.75, 0, 0))
+    assert np.isclose(Part.Face(small.Shape).Area, 0.5 * 1.5)
+    assert np.allclose(getBB(offsetSketch(sketch, 0.5)), getBB(big))
+    with pytest.raises(ValueError):
+        offsetSketch(sketch, -0.6)
+
+
 def test_centerObjects(fix_FCDoc):
     """Check centering of boxes."""
     # TODO: centering or snapping to zero?
@@ -178,3 +275,25 @@ def test_crossSection(fix_FCDoc):
     fix_FCDoc.recompute()
     cross = crossSection(box)
     assert getBB(cross) == (1.0, 1.0, 0, 10, 0, 10)
+
+
+def test_sectionRings(fix_FCDoc):
+    """Test cross-section rings computed without document objects."""
+    box = fix_FCDoc.addObject("Part::Box", "Box")
+    cylinder = fix_FCDoc.addObject("Part::Cylinder", "Cylinder")
+    cylinder.Radius = 2.0
+    fix_FCDoc.recompute()
+    numObjects = len(fix_FCDoc.Objects)
+
+    rings = sectionRings(box.Shape)
+    assert len(rings) == 1
+    assert rings[0].shape == (4, 3)
+    assert np.allclose(rings[0][:, 0], 1.0)
+    assert np.allclose(np.sort(rings[0][:, 1]), [0, 0, 10, 10])
+
+    rings = sectionRings(cylinder.Shape, axis=(0, 0, 1), d=1.0, deflection=0.01)
+    assert len(rings) == 1
+    assert len(rings[0]) > 20
+    assert np.allclose(np.linalg.norm(rings[0][:, :2], axis=1), 2.0)
+    assert np.allclose(rings[0][:, 2], 1.0)
+    assert len(fix_FCDoc.Objects) == numObjects
@@ -27,6 +27,26 @@ def test_build_extrude(fix_FCDoc, fix_hexagon_sketch):
     # TODO
 
 
+def test_gen_offset_cache(fix_FCDoc, fix_hexagon_sketch):
+    """Test that offsets are memoized until they are deleted."""
+    sketch = fix_hexagon_sketch()
+    input_part = part_3d.ExtrudePart("label", sketch.Name, thickness=10)
+    built_part = build_extrude(input_part)
+    opts = {"input_parts": [input_part], "built_part_names": {}}
+    trash = []
+    offset = gen_offset(opts, built_part, 1.0, trash=trash)
+    assert gen_offset(opts, built_part, 1.0, trash=trash) is offset
+    assert gen_offset(opts, built_part, 2.0, trash=trash) is not offset
+    assert len(opts["offset_cache"]) == 2
+    assert len(trash) == 2  # cached offsets are not added again
+    # Deleted offsets are rebuilt, even if their name is taken again
+    offset_name = offset.Name
+    delete(offset)
+    fix_FCDoc.addObject("Part::Box", offset_name)
+    rebuilt = gen_offset(opts, built_part, 1.0, trash=trash)
+    assert rebuilt in fix_FCDoc.Objects and rebuilt.TypeId != "Part::Box"
+
+
 # ~ def test_buildWire():
 # ~ '''Test wire via bounding box for default offsets/zBottom.
 # ~ TODO: all cases
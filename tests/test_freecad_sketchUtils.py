@@ -106,6 +106,35 @@ def test_findEdgeCycles(fix_FCDoc, fix_two_cycle_sketch):
     assert cycles[1] == [4, 5, 6]
 
 
+def test_findCycles():
+    """Test cycle detection on shuffled segments with reversed orientation."""
+    numPoints = 1000
+    angles = np.linspace(0, 2 * np.pi, numPoints, endpoint=False)
+    points = np.stack([np.cos(angles), np.sin(angles), np.zeros(numPoints)], axis=1)
+    square = np.array([[3, 0, 0], [4, 0, 0], [4, 1, 0], [3, 1, 0]], dtype=float)
+    segArr = np.concatenate(
+        [
+            np.stack([points, np.roll(points, -1, axis=0)], axis=1),
+            np.stack([square, np.roll(square, -1, axis=0)], axis=1),
+        ]
+    )
+    perm = np.random.RandomState(0).permutation(len(segArr))
+    segArr = segArr[perm]
+    segArr[::3] = segArr[::3, ::-1]
+    cycles = findCycles(segArr)
+    assert sorted(len(cycle) for cycle in cycles) == [4, numPoints]
+    assert sorted(i for cycle in cycles for i in cycle) == list(range(len(segArr)))
+    for cycle in cycles:
+        assert cycle[0] == min(cycle)
+        assert np.allclose(segArr[cycle, 1], segArr[np.roll(cycle, -1), 0])
+    for ring, cycle in zip(cycleRings(segArr, cycles), cycles):
+        assert ring.shape == (len(cycle), 3)
+
+    with pytest.raises(ValueError) as err:
+        findCycles(segArr[1:])
+    assert "No paths found" in str(err.value)
+
+
 def test_findEdgeCycles2(fix_FCDoc, fix_two_cycle_sketch):
     """Test multiple cycle ordering."""
     sketch = fix_two_cycle_sketch()
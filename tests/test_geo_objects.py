@@ -1,3 +1,4 @@
+import pytest
 from qmt.geometry import part_3d, build_3d_geometry, Geo2DData
 import numpy as np
 import os
@@ -149,3 +150,74 @@ def test_crop():
         (9.0, 1.0),
         (9.0, 4.0),
     }
+
+
+def test_rasterize(datadir):
+    small1 = part_3d.ExtrudePart("small1", "Sketch001", z0=-2, thickness=2)
+    big = part_3d.ExtrudePart("big", "Sketch", z0=-4, thickness=8)
+    smallv = part_3d.ExtrudePart(
+        "smallv", "Sketch001", z0=-1, thickness=2, virtual=True
+    )
+    file_path = os.path.join(datadir, "simple.FCStd")
+    geo_data = build_3d_geometry(
+        input_parts=[small1, big, smallv], input_file=file_path
+    )
+
+    part_map = geo_data.rasterize(0.5)
+    assert part_map.labels.dtype == np.int16
+    assert part_map.partNames == ["small1", "big"]
+    assert part_map((0.1, 0.1, -1.1)) == "small1"
+    assert part_map((0.1, 8.1, 2.1)) == "big"
+    assert part_map((0.1, 0.1, 100.0)) is None
+
+    virtual_map = geo_data.rasterize(0.5, include_virtual=True)
+    assert virtual_map.partNames == ["small1", "big", "smallv"]
+    assert virtual_map((0.1, 0.1, -1.1)) == "small1"
+
+
+def test_xsec_sweep(datadir):
+    small1 = part_3d.ExtrudePart("small1", "Sketch001", z0=-2, thickness=2)
+    big = part_3d.ExtrudePart("big", "Sketch", z0=-4, thickness=8)
+    file_path = os.path.join(datadir, "simple.FCStd")
+    geo_data = build_3d_geometry(
+        input_parts=[small1, big],
+        input_file=file_path,
+        xsec_dict={"test_xsec": {"axis": (1, 0, 0), "distance": 0}},
+    )
+
+    reference = geo_data.xsec_to_2d("test_xsec")
+    (swept,) = geo_data.xsec_sweep([0.0])
+    assert set(swept.parts) == set(reference.parts)
+    for name, part in reference.parts.items():
+        assert swept.parts[name].equals(part)
+
+    distances = np.linspace(-20, 20, 9)
+    stack = geo_data.xsec_sweep(distances, max_workers=2)
+    assert len(stack) == len(distances)
+    assert not stack[0].parts and not stack[-1].parts
+    assert set(stack[4].parts) == set(reference.parts)
+
+
+def test_xsecs_to_2d(datadir):
+    small1 = part_3d.ExtrudePart("small1", "Sketch001", z0=-2, thickness=2)
+    small2 = part_3d.ExtrudePart("small2", "Sketch002", z0=0, thickness=2)
+    big = part_3d.ExtrudePart("big", "Sketch", z0=-4, thickness=8)
+    file_path = os.path.join(datadir, "simple.FCStd")
+    geo_data = build_3d_geometry(
+        input_parts=[small1, small2, big],
+        input_file=file_path,
+        xsec_dict={
+            "x_xsec": {"axis": (1, 0, 0), "distance": 0},
+            "z_xsec": {"axis": (0, 0, 1), "distance": 1},
+        },
+    )
+
+    nesting = geo_data.xsecs_to_2d()
+    solid = geo_data.xsecs_to_2d(cavity_detection="solid")
+    assert set(nesting) == {"x_xsec", "z_xsec"}
+    for xsec_name, geo_2d in nesting.items():
+        assert set(geo_2d.parts) == set(solid[xsec_name].parts)
+        for name, part in geo_2d.parts.items():
+            assert part.equals(solid[xsec_name].parts[name])
+    with pytest.raises(ValueError):
+        geo_data.xsec_to_2d("x_xsec", cavity_detection="winding")
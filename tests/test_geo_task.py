@@ -6,8 +6,26 @@
 
 import numpy as np
 import os
+import pytest
 import tempfile
-from qmt.geometry import part_3d, build_3d_geometry
+from qmt.geometry import (
+    part_3d,
+    build_3d_geometry,
+    build_3d_geometry_sweep,
+    Geo3DBuildPool,
+)
+
+
+def _part_geometry(part):
+    """Return the volume and bounding box of a built part from its STEP export."""
+    import Part
+    from qmt.infrastructure import load_serial
+
+    shape = load_serial(part.serial_stp, Part.read, "stp")
+    box = shape.BoundBox
+    return np.array(
+        [shape.Volume, box.XMin, box.YMin, box.ZMin, box.XMax, box.YMax, box.ZMax]
+    )
 
 
 def test_geo_task(datadir):
@@ -59,3 +77,310 @@ def test_geo_task(datadir):
             file_name = os.path.join(temp_dir_path, f"{i}.fcstd")
             result.write_fcstd(file_name)
             # TODO: should find a meaningful test here
+
+
+def test_geo_sweep(datadir):
+    """Tests the parallel geometry sweep against serial builds."""
+    block1 = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    block2 = part_3d.ExtrudePart("Two blocks", "Sketch001", thickness=0.5)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    build_order = [block1, block2]
+
+    d1_values = [2.0, 4.5, 7.0]
+    results = {}
+    for index, params, geo in build_3d_geometry_sweep(
+        input_parts=build_order,
+        input_file=input_file_path,
+        param_grid={"d1": d1_values},
+        max_workers=2,
+    ):
+        assert params == {"d1": d1_values[index]}
+        results[index] = geo
+    assert sorted(results.keys()) == [0, 1, 2]
+
+    for index, d1 in enumerate(d1_values):
+        serial_geo = build_3d_geometry(
+            input_parts=build_order, input_file=input_file_path, params={"d1": d1}
+        )
+        assert list(results[index].parts.keys()) == list(serial_geo.parts.keys())
+        for label, part in serial_geo.parts.items():
+            assert np.allclose(
+                _part_geometry(results[index].parts[label]), _part_geometry(part)
+            )
+    # The parameter reaches the builds
+    assert not np.allclose(
+        _part_geometry(results[0].parts["Parametrised block"]),
+        _part_geometry(results[2].parts["Parametrised block"]),
+    )
+
+
+def test_warm_template(datadir):
+    """Tests that builds in a warm template leave the template untouched."""
+    import FreeCAD
+    from qmt.geometry.freecad.templateCache import getTemplateDoc, closeTemplate
+    from qmt.geometry.freecad.templateCache import templateKey
+    from qmt.infrastructure import serialize_file
+
+    block1 = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    block2 = part_3d.ExtrudePart("Two blocks", "Sketch001", thickness=0.5)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    serial_fcdoc = serialize_file(input_file_path, binary=True)
+    template_doc = getTemplateDoc(serial_fcdoc)
+    template_objects = sorted(obj.Name for obj in template_doc.Objects)
+
+    warm_blocks = {}
+    for d1 in [2.0, 7.0, 2.0]:
+        warm_geo = build_3d_geometry(
+            input_parts=[block1, block2],
+            serialized_input_file=serial_fcdoc,
+            params={"d1": d1},
+            keep_template=True,
+        )
+        cold_geo = build_3d_geometry(
+            input_parts=[block1, block2],
+            serialized_input_file=serial_fcdoc,
+            params={"d1": d1},
+        )
+        assert getTemplateDoc(serial_fcdoc).Name == template_doc.Name
+        assert sorted(obj.Name for obj in template_doc.Objects) == template_objects
+        for label, part in cold_geo.parts.items():
+            assert np.allclose(
+                _part_geometry(warm_geo.parts[label]), _part_geometry(part)
+            )
+        warm_blocks[d1] = _part_geometry(warm_geo.parts["Parametrised block"])
+    assert not np.allclose(warm_blocks[2.0], warm_blocks[7.0])
+    # Changes that bypass the rollback are detected and the template is reloaded
+    params_cell = template_doc.modelParams.get("B2")
+    template_doc.modelParams.set("B2", "42")
+    template_doc.recompute()
+    template_doc = getTemplateDoc(serial_fcdoc)
+    assert template_doc.modelParams.get("B2") == params_cell
+    closeTemplate(templateKey(serial_fcdoc))
+    assert template_doc.Name not in FreeCAD.listDocuments()
+
+
+def test_build_pool(datadir):
+    """Tests reusing a pool of warm workers."""
+    block1 = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    with Geo3DBuildPool(max_workers=2) as pool:
+        futures = [
+            pool.submit_build([block1], input_file=input_file_path, params={"d1": d1})
+            for d1 in [2.0, 4.5, 7.0, 2.0]
+        ]
+        geos = [future.result() for future in futures]
+        swept = list(
+            build_3d_geometry_sweep(
+                [block1],
+                input_file=input_file_path,
+                param_grid=[{"d1": 2.0}],
+                executor=pool,
+            )
+        )
+    assert all(list(geo.parts.keys()) == ["Parametrised block"] for geo in geos)
+    blocks = [_part_geometry(geo.parts["Parametrised block"]) for geo in geos]
+    for d1, block in zip([2.0, 4.5, 7.0], blocks):
+        serial_geo = build_3d_geometry(
+            input_parts=[block1], input_file=input_file_path, params={"d1": d1}
+        )
+        assert np.allclose(
+            block, _part_geometry(serial_geo.parts["Parametrised block"])
+        )
+    assert not np.allclose(blocks[0], blocks[2])
+    assert np.allclose(blocks[3], blocks[0])
+    assert np.allclose(
+        _part_geometry(swept[0][2].parts["Parametrised block"]), blocks[0]
+    )
+
+
+def test_incremental_build(datadir):
+    """Tests that incremental rebuilds match full builds and reuse unchanged parts."""
+    block1 = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    block2 = part_3d.ExtrudePart("Two blocks", "Sketch001", thickness=0.5)
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    build_order = [block1, block2, substrate]
+    xsec_dict = {"xsec": {"axis": (1.0, 0.0, 0.0), "distance": 0.0}}
+
+    first = build_3d_geometry(
+        input_parts=build_order,
+        input_file=input_file_path,
+        params={"d1": 2.0},
+        xsec_dict=xsec_dict,
+        incremental=True,
+    )
+    assert first.build_record is not None
+
+    # Nothing changed, so everything is reused
+    same = build_3d_geometry(
+        input_parts=build_order,
+        input_file=input_file_path,
+        params={"d1": 2.0},
+        xsec_dict=xsec_dict,
+        previous=first,
+    )
+    for label, part in first.parts.items():
+        assert same.parts[label].serial_stl is part.serial_stl
+    assert same.xsecs["xsec"]["polygons"] == first.xsecs["xsec"]["polygons"]
+
+    # Changing d1 rebuilds the parts that depend on it
+    updated = build_3d_geometry(
+        input_parts=build_order,
+        input_file=input_file_path,
+        params={"d1": 7.0},
+        xsec_dict=xsec_dict,
+        previous=first,
+    )
+    full = build_3d_geometry(
+        input_parts=build_order,
+        input_file=input_file_path,
+        params={"d1": 7.0},
+        xsec_dict=xsec_dict,
+    )
+    assert list(updated.parts.keys()) == list(full.parts.keys())
+    for label, part in full.parts.items():
+        assert len(updated.parts[label].serial_stl) == len(part.serial_stl)
+    assert list(updated.xsecs["xsec"]["polygons"].keys()) == list(
+        full.xsecs["xsec"]["polygons"].keys()
+    )
+
+
+def test_incremental_compression(datadir):
+    """Tests that incremental rebuilds re-export parts stored with another compression."""
+    pytest.importorskip("zstandard")
+    from qmt.infrastructure.data_utils import _ZSTD_MAGIC
+
+    block1 = part_3d.ExtrudePart("Parametrised block", "Sketch", thickness=5.0, z0=-2.5)
+    block2 = part_3d.ExtrudePart("Two blocks", "Sketch001", thickness=0.5)
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    build_order = [block1, block2, substrate]
+
+    first = build_3d_geometry(
+        input_parts=build_order,
+        input_file=input_file_path,
+        params={"d1": 2.0},
+        incremental=True,
+    )
+    for part in first.parts.values():
+        assert bytes(part.serial_stp[:4]) != _ZSTD_MAGIC
+
+    # Unchanged and rebuilt parts are both stored with the new compression
+    for d1 in (2.0, 7.0):
+        updated = build_3d_geometry(
+            input_parts=build_order,
+            input_file=input_file_path,
+            params={"d1": d1},
+            previous=first,
+            serial_compression="zstd",
+        )
+        for part in updated.parts.values():
+            assert bytes(part.serial_stp[:4]) == _ZSTD_MAGIC
+            assert bytes(part.serial_stl[:4]) == _ZSTD_MAGIC
+            assert part.export_source[1] == "zstd"
+
+
+def test_shape_boolean_engine(datadir):
+    """Tests that the shape boolean engine gives the same parts."""
+    wire = part_3d.WirePart("Nanowire", "Sketch003", z0=0, thickness=0.5)
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    wrap = part_3d.LithographyPart(
+        "First Layer",
+        "Sketch006",
+        z0=0,
+        layer_num=1,
+        thickness=4,
+        litho_base=[substrate],
+    )
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    geos = {
+        engine: build_3d_geometry(
+            input_parts=[wire, substrate, wrap],
+            input_file=input_file_path,
+            boolean_engine=engine,
+        )
+        for engine in ["document", "shape"]
+    }
+    assert list(geos["shape"].parts.keys()) == list(geos["document"].parts.keys())
+    for label, part in geos["document"].parts.items():
+        assert np.allclose(
+            _part_geometry(geos["shape"].parts[label]), _part_geometry(part)
+        )
+
+
+def test_export_formats(datadir):
+    """Tests skipping export formats and exporting in parallel."""
+    wire = part_3d.WirePart("Nanowire", "Sketch003", z0=0, thickness=0.5)
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    geo = build_3d_geometry(
+        input_parts=[wire, substrate],
+        input_file=input_file_path,
+        export_formats=["stl"],
+        export_workers=2,
+    )
+    assert list(geo.parts) == ["Nanowire", "Substrate"]
+    for part in geo.parts.values():
+        assert part.serial_stp is None
+        assert part.serial_stl is not None
+    with pytest.raises(ValueError):
+        build_3d_geometry(
+            input_parts=[wire], input_file=input_file_path, export_formats=["obj"]
+        )
+
+
+def test_lazy_export(datadir):
+    """Tests exporting parts on demand."""
+    wire = part_3d.WirePart("Nanowire", "Sketch003", z0=0, thickness=0.5)
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    geo = build_3d_geometry(
+        input_parts=[wire, substrate], input_file=input_file_path, export_formats=[]
+    )
+    nanowire = geo.parts["Nanowire"]
+    assert nanowire.serial_stp is None and nanowire.serial_stl is None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = nanowire.write_stp(os.path.join(temp_dir, "nanowire.stp"))
+        assert os.path.getsize(path) > 0
+    assert nanowire.serial_stp is not None
+    assert nanowire.get_serial("stp") is nanowire.serial_stp
+    assert geo.parts["Substrate"].serial_stp is None
+    geo.export_parts(["stl"])
+    for part in geo.parts.values():
+        assert part.serial_stl is not None
+    with pytest.raises(ValueError):
+        nanowire.get_serial("obj")
+
+
+def test_parallel_lithography(datadir):
+    """Tests that lithography parts built by worker processes are the same."""
+    substrate = part_3d.ExtrudePart("Substrate", "Sketch005", z0=-2, thickness=2)
+    wrap = part_3d.LithographyPart(
+        "First Layer",
+        "Sketch006",
+        z0=0,
+        layer_num=1,
+        thickness=4,
+        litho_base=[substrate],
+    )
+    wrap2 = part_3d.LithographyPart(
+        "Second Layer", "Sketch007", layer_num=2, thickness=1
+    )
+    input_file_path = os.path.join(datadir, "geometry_test.fcstd")
+    geos = [
+        build_3d_geometry(
+            input_parts=[substrate, wrap, wrap2],
+            input_file=input_file_path,
+            xsec_dict={"xsec": {"axis": (1, 0, 0), "distance": 0}},
+            export_formats=[],
+            litho_workers=workers,
+        )
+        for workers in (1, 2)
+    ]
+    assert list(geos[0].parts) == list(geos[1].parts)
+    polygons = [geo.xsecs["xsec"]["polygons"] for geo in geos]
+    assert set(polygons[0]) == set(polygons[1])
+    for name in polygons[0]:
+        assert np.allclose(
+            sorted(map(tuple, polygons[0][name])), sorted(map(tuple, polygons[1][name]))
+        )
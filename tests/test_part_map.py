@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Testing part maps."""
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from qmt.geometry import Geo2DData, Geo2DPartMap, Geo3DPartMap, MaterialPropertyMap
+from qmt.materials import Materials
+
+
+def _overlapping_squares():
+    geo = Geo2DData()
+    geo.add_part("top", Polygon([(1, 1), (3, 1), (3, 3), (1, 3)]))
+    geo.add_part("bottom", Polygon([(0, 0), (2, 0), (2, 2), (0, 2)]))
+    return geo
+
+
+def test_geo_2d_part_map():
+    part_map = Geo2DPartMap(_overlapping_squares(), fill_value="vacuum")
+    assert part_map((0.5, 0.5)) == "bottom"
+    # The overlap is resolved by the build order
+    assert part_map((1.5, 1.5)) == "top"
+    assert part_map((10.0, 10.0)) == "vacuum"
+    # Points on the boundary belong to the part
+    assert part_map((0.0, 1.0)) == "bottom"
+
+    points = np.array([[0.5, 0.5], [1.5, 1.5], [2.5, 2.5], [-1.0, 0.5]])
+    assert list(part_map(points)) == ["bottom", "top", "top", "vacuum"]
+    assert list(part_map.part_indices(points)) == [1, 0, 0, -1]
+    assert part_map(np.ones((4, 3, 2)) * 0.5).shape == (4, 3)
+
+
+def test_geo_2d_part_map_materials():
+    part_map = Geo2DPartMap(_overlapping_squares())
+    mat_lib = Materials(matDict={})
+    mat_lib.add_material("Al", "metal", workFunction=4280.0)
+    mat_lib.add_material("Au", "metal", workFunction=5285.0)
+    prop_map = MaterialPropertyMap(
+        part_map,
+        {"top": "Al", "bottom": "Au"},
+        mat_lib,
+        "workFunction",
+        eunit="meV",
+        fill_value=0.0,
+    )
+    points = np.array([[0.5, 0.5], [2.5, 2.5], [5.0, 5.0]])
+    assert np.allclose(prop_map(points), [5285.0, 4280.0, 0.0])
+
+
+def test_geo_3d_part_map():
+    labels = -np.ones((2, 2, 2), dtype=np.int16)
+    labels[0, :, :] = 0
+    labels[1, 1, 1] = 1
+    part_map = Geo3DPartMap(labels, (0.0, 0.0, 0.0), 0.5, ["left", "corner"])
+    assert part_map((0.1, 0.9, 0.2)) == "left"
+    assert part_map((0.9, 0.9, 0.9)) == "corner"
+    assert part_map((0.9, 0.1, 0.1)) is None
+    # Points on the upper faces of the grid map to the last cell
+    assert part_map((1.0, 1.0, 1.0)) == "corner"
+    points = np.array([[0.2, 0.2, 0.2], [0.7, 0.7, 0.7], [2.0, 0.0, 0.0]])
+    assert list(part_map.part_indices(points)) == [0, 1, -1]